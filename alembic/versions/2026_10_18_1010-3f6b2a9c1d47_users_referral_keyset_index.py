@@ -0,0 +1,40 @@
+"""Users referral keyset index
+
+Revision ID: 3f6b2a9c1d47
+Revises: cef1e4ff4dda
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b2a9c1d47'
+down_revision = 'cef1e4ff4dda'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # built concurrently so the users table stays writable on large installs
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix__users_referral_id_created_at_id',
+            'users',
+            ['referral_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(op.f('ix__users_referral_id'), table_name='users', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix__users_referral_id'),
+            'users',
+            ['referral_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index('ix__users_referral_id_created_at_id', table_name='users', postgresql_concurrently=True)
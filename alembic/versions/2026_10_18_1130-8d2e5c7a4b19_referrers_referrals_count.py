@@ -0,0 +1,35 @@
+"""Referrers referrals count
+
+Revision ID: 8d2e5c7a4b19
+Revises: 3f6b2a9c1d47
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e5c7a4b19'
+down_revision = '3f6b2a9c1d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'referrers',
+        sa.Column('referrals_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    )
+    op.execute(
+        """
+        UPDATE referrers
+        SET referrals_count = counts.total
+        FROM (SELECT referral_id, count(*) AS total FROM users GROUP BY referral_id) AS counts
+        WHERE referrers.referrer_id = counts.referral_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('referrers', 'referrals_count')
@@ -0,0 +1,25 @@
+"""Referrers user id unique
+
+Revision ID: b51f0e3a9c62
+Revises: 8d2e5c7a4b19
+Create Date: 2026-10-18 12:15:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b51f0e3a9c62'
+down_revision = '8d2e5c7a4b19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # fails if a user already has several referrers (possible through the old check-then-insert race);
+    # remove the extra rows before upgrading
+    op.create_unique_constraint(op.f('uq__referrers__user_id'), 'referrers', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint(op.f('uq__referrers__user_id'), 'referrers', type_='unique')
@@ -4,27 +4,47 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.docs import get_swagger_ui_html
 from fastapi.openapi.utils import get_openapi
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from fastapi_oauth2.exceptions import OAuth2Error
 
+import functools
 from contextlib import asynccontextmanager
 
+import orjson
 from dishka import make_async_container
 from dishka.integrations.fastapi import setup_dishka
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from app import __version__
 from app.core.config import settings
+from app.core.db import ReplicaSet
 from app.core.ioc import AdaptersProvider, InteractorProvider
-from app.routers import api_router
+from app.core.metrics import MetricsMiddleware, monitor_event_loop_lag, render
+from app.core.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+from app.core.redis import RedisConnectionPool
+from app.routers import api_router, well_known_router
+from app.services.revocation import TokenRevocationList
 from app.services.security import OAuth2Middleware, on_auth
+from app.utils.precompressed import Precompressed
+from app.utils.tasks import spawn
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.TRACING_ENABLED:
+        setup_tracing()
+    await app.state.dishka_container.get(ReplicaSet)
+    await app.state.dishka_container.get(RedisConnectionPool)
+    await app.state.dishka_container.get(TokenRevocationList)
+    lag_monitor = spawn(monitor_event_loop_lag())
+    openapi_schema()
     yield
+    lag_monitor.cancel()
     await app.state.dishka_container.close()
+    if settings.TRACING_ENABLED:
+        shutdown_tracing()
 
 
 app = FastAPI(title=settings.PROJECT_NAME, docs_url=None, lifespan=lifespan)
@@ -38,11 +58,16 @@ app.add_middleware(
 )
 
 app.include_router(api_router, prefix=settings.BASE_PATH_PREFIX)
+app.include_router(well_known_router)
 app.add_middleware(OAuth2Middleware, config=settings.oauth2_config, callback=on_auth)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 container = make_async_container(AdaptersProvider(), InteractorProvider())
 setup_dishka(container, app)
+# outermost, so the recorded latency includes authentication
+app.add_middleware(MetricsMiddleware)
+if settings.TRACING_ENABLED:
+    app.add_middleware(TracingMiddleware)
 
 
 @app.exception_handler(RequestValidationError)
@@ -58,7 +83,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     content = jsonable_encoder(
         {"error": exc.detail.get("error"), "error_description": exc.detail.get("error_description")}
     )
-    return JSONResponse(status_code=exc.status_code, content=content)
+    return JSONResponse(status_code=exc.status_code, content=content, headers=exc.headers)
 
 
 @app.exception_handler(OAuth2Error)
@@ -67,6 +92,11 @@ async def error_handler(request: Request, e: OAuth2Error):
     return RedirectResponse(url="/", status_code=303)
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(render(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/specs", include_in_schema=False)
 async def swagger_ui_html():
     return get_swagger_ui_html(
@@ -75,11 +105,17 @@ async def swagger_ui_html():
     )
 
 
-@app.get("/specs/openapi.json", include_in_schema=False)
-async def openapi(req: Request) -> JSONResponse:
+@functools.cache
+def openapi_schema() -> Precompressed:
+    # routes don't change after startup, so the schema is built and compressed once per worker
     openapi = get_openapi(
         title=settings.PROJECT_NAME,
         version=__version__,
         routes=app.routes,
     )
-    return JSONResponse(openapi)
+    return Precompressed(orjson.dumps(openapi), media_type="application/json")
+
+
+@app.get("/specs/openapi.json", include_in_schema=False)
+async def openapi(req: Request) -> Response:
+    return openapi_schema().response(req)
@@ -0,0 +1,110 @@
+"""Maintenance commands.
+
+Usage: python -m app.cli <command> [options]
+"""
+import argparse
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.db import AsyncSessionFactory, DbConnection, engine, replicas
+from app.daos.referrer import ReferrerDao
+from app.schemas.imports import DataFormat, ImportBatchReport, RejectedRow
+from app.services.hashers import get_password_hashers
+from app.services.importer import UserImportService
+from app.utils.executor import BoundedExecutor
+
+
+async def reconcile_referrals(batch_size: int) -> None:
+    """Recount every referrer's referrals and fix the counters that drifted."""
+    after_id, fixed = 0, 0
+    async with AsyncSessionFactory() as session:
+        referrer_dao = ReferrerDao(db_connection=DbConnection(session=session))
+        while True:
+            last_id, drifted = await referrer_dao.reconcile_referrals_count(after_id, batch_size)
+            if last_id is None:
+                break
+            fixed += drifted
+            after_id = last_id
+            logging.info(f"Reconciled referrers up to id {last_id}, {drifted} counters fixed")
+    await engine.dispose()
+    await replicas.stop()
+    logging.info(f"Reconciliation done, {fixed} counters fixed")
+
+
+async def _read_chunks(path: Path, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with path.open("rb") as file:
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield chunk
+
+
+def _log_batch(batch: ImportBatchReport, rejected: list[RejectedRow]) -> None:
+    logging.info(
+        f"Batch {batch.batch}: {batch.inserted} inserted, {batch.duplicates} duplicates, "
+        f"{batch.rejected} rejected in {batch.seconds}s ({batch.rows_per_second} rows/s)"
+    )
+    for row in rejected:
+        logging.warning(f"Line {row.line} rejected: {row.error}")
+
+
+async def import_users(path: Path, fmt: DataFormat, batch_size: int) -> None:
+    """Import users from an NDJSON or CSV file."""
+    executor = BoundedExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+        thread_name_prefix="password-hash",
+    )
+    try:
+        async with AsyncSessionFactory() as session:
+            user_import = UserImportService(DbConnection(session=session), executor, get_password_hashers())
+            report = await user_import.run(_read_chunks(path), fmt, batch_size, on_batch=_log_batch)
+    finally:
+        executor.shutdown()
+        await engine.dispose()
+        await replicas.stop()
+    logging.info(
+        f"Import done in {report.seconds}s: {report.inserted} inserted, "
+        f"{report.duplicates} duplicates, {report.rejected} rejected"
+    )
+
+
+def _batch_size(value: str) -> int:
+    batch_size = int(value)
+    if batch_size <= 0:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return batch_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    reconcile = commands.add_parser("reconcile-referrals", help="Recount referrals of every referrer")
+    reconcile.add_argument("--batch-size", type=_batch_size, default=1000)
+
+    import_ = commands.add_parser("import-users", help="Import users from an NDJSON or CSV file")
+    import_.add_argument("path", type=Path)
+    import_.add_argument("--format", choices=[fmt.value for fmt in DataFormat], help="defaults to the file extension")
+    import_.add_argument(
+        "--batch-size",
+        type=_batch_size,
+        default=settings.IMPORT_BATCH_SIZE,
+        help="rows per transaction; larger batches are inserted with several statements",
+    )
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if args.command == "reconcile-referrals":
+        asyncio.run(reconcile_referrals(args.batch_size))
+    elif args.command == "import-users":
+        try:
+            fmt = DataFormat(args.format or args.path.suffix.lstrip(".").lower())
+        except ValueError:
+            parser.error("cannot tell the format from the file extension, pass --format")
+        asyncio.run(import_users(args.path, fmt, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
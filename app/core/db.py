@@ -1,23 +1,268 @@
+import asyncio
+import logging
+import time
 from abc import abstractmethod
-from typing import Protocol
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Protocol, Self
 
+from sqlalchemy import event, exc, text
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql.base import Executable
+from sqlalchemy.sql.dml import UpdateBase
 
 from app.core.config import settings
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_WAIT, DB_POOL_EVENTS
+from app.schemas.stats import DbPoolStats, ReplicaStats
+
+
+class PoolMetrics:
+    """Pool counters, also exported to Prometheus labelled with ``pool``.
+
+    They survive the pool being recreated when the engine is disposed.
+    """
+
+    def __init__(self, pool: str = "primary") -> None:
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self._events = {
+            event: DB_POOL_EVENTS.labels(pool, event)
+            for event in ("connect", "checkout", "invalidate", "wait", "timeout")
+        }
+        self._wait_time = DB_POOL_CHECKOUT_WAIT.labels(pool)
+        self._checked_out = DB_POOL_CHECKED_OUT.labels(pool)
+
+    def connected(self) -> None:
+        self.connects += 1
+        self._events["connect"].inc()
+
+    def checked_out(self) -> None:
+        self.checkouts += 1
+        self._events["checkout"].inc()
+        self._checked_out.inc()
+
+    def checked_in(self) -> None:
+        self._checked_out.dec()
+
+    def invalidated(self) -> None:
+        self.invalidations += 1
+        self._events["invalidate"].inc()
+
+    def waited(self, seconds: float, timed_out: bool) -> None:
+        self.waits += 1
+        self.wait_time += seconds
+        self._events["wait"].inc()
+        self._wait_time.observe(seconds)
+        if timed_out:
+            self.timeouts += 1
+            self._events["timeout"].inc()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that keeps track of how often and how long checkouts had to wait for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        # QueuePool._do_get only blocks once the pool and the overflow are both used up
+        if self._max_overflow == -1 or self._overflow < self._max_overflow or not self._pool.empty():
+            return super()._do_get()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.metrics.waited(time.perf_counter() - started, timed_out)
+
+    def stats(self) -> DbPoolStats:
+        return DbPoolStats(
+            size=self.size(),
+            checked_out=self.checkedout(),
+            idle=self.checkedin(),
+            overflow=max(0, self.overflow()),
+            max_overflow=self._max_overflow,
+            connects=self.metrics.connects,
+            checkouts=self.metrics.checkouts,
+            invalidations=self.metrics.invalidations,
+            waits=self.metrics.waits,
+            wait_time=self.metrics.wait_time,
+            timeouts=self.metrics.timeouts,
+        )
+
+
+def create_engine(url: str, name: str) -> AsyncEngine:
+    """``name`` labels the pool's metrics."""
+    server_settings = {}
+    if settings.DB_STATEMENT_TIMEOUT:
+        server_settings["statement_timeout"] = str(settings.DB_STATEMENT_TIMEOUT)
+    _engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={
+            # SQLAlchemy prepares statements itself and keeps them in its own per-connection cache;
+            # asyncpg's cache only serves queries run on the raw connection
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
+
+    _engine.pool.metrics = PoolMetrics(name)
+
+    @event.listens_for(_engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        _engine.pool.metrics.connected()
+
+    @event.listens_for(_engine.sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        _engine.pool.metrics.checked_out()
+
+    @event.listens_for(_engine.sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        _engine.pool.metrics.checked_in()
+
+    @event.listens_for(_engine.sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        _engine.pool.metrics.invalidated()
+
+    return _engine
+
+
+class ReplicaSet:
+    """Read replicas handed out round-robin, skipping those that failed their last health check.
+
+    A replica is also taken out of rotation as soon as one of its connections is lost, and put back
+    by the next health check it passes.
+    """
+
+    def __init__(self, engines: list[AsyncEngine]) -> None:
+        self.engines = engines
+        self.healthy = set(engines)
+        self._next = 0
+        self._task: asyncio.Task | None = None
+        for _engine in engines:
+            event.listen(_engine.sync_engine, "handle_error", self._on_error(_engine))
+
+    def _on_error(self, _engine: AsyncEngine):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                self.mark_down(_engine)
+
+        return handle_error
+
+    def pick(self) -> AsyncEngine | None:
+        for _ in range(len(self.engines)):
+            _engine = self.engines[self._next % len(self.engines)]
+            self._next += 1
+            if _engine in self.healthy:
+                return _engine
+        return None
+
+    def mark_down(self, _engine: AsyncEngine) -> None:
+        if _engine in self.healthy:
+            logging.warning(f"Replica {_engine.url.host} is down, reading from the primary")
+            self.healthy.discard(_engine)
+
+    async def check(self) -> None:
+        for _engine in self.engines:
+            try:
+                async with asyncio.timeout(settings.REPLICA_HEALTH_CHECK_INTERVAL):
+                    async with _engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+            except Exception:
+                self.mark_down(_engine)
+            else:
+                self.healthy.add(_engine)
+
+    async def _run_checks(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REPLICA_HEALTH_CHECK_INTERVAL)
+            await self.check()
+
+    async def start(self) -> None:
+        if self.engines:
+            await self.check()
+            self._task = asyncio.create_task(self._run_checks())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for _engine in self.engines:
+            await _engine.dispose()
+
+    def stats(self) -> list[ReplicaStats]:
+        return [
+            ReplicaStats(host=_engine.url.host, healthy=_engine in self.healthy, pool=_engine.pool.stats())
+            for _engine in self.engines
+        ]
+
 
 postgres_url = settings.SQLALCHEMY_DATABASE_URI.unicode_string()
 
-engine = create_async_engine(postgres_url, echo=False, future=True)
+engine = create_engine(postgres_url, "primary")
+replicas = ReplicaSet(
+    [create_engine(uri.unicode_string(), f"replica:{uri.host}") for uri in settings.POSTGRES_REPLICA_URIS]
+)
+
+
+class RoutingSession(Session):
+    """Sends statements marked with the ``use_replica`` execution option to a healthy replica.
+
+    Everything else goes to the primary. Once the session has written anything, its reads stay on
+    the primary too, so a request reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["pin_primary"] = True
+        elif (
+            replicas.engines
+            and not self.info.get("pin_primary")
+            and isinstance(clause, Executable)
+            and clause.get_execution_options().get("use_replica")
+        ):
+            replica = replicas.pick()
+            if replica is not None:
+                return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
 AsyncSessionFactory = async_sessionmaker(
     autocommit=False,
     autoflush=False,
     expire_on_commit=False,
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
 )
 
 
@@ -32,11 +277,45 @@ class BaseDbConnection(Protocol):
 
 
 class DbConnection(BaseDbConnection):
-    def __init__(self, session: AsyncSession) -> None:
-        self.session = session
+    """Request-scoped unit of work over a lazily created session.
+
+    The session is only created when something uses it, and it only holds a pooled connection from the
+    first statement until the transaction ends. DAOs call ``commit()`` after their writes; inside
+    ``transaction()`` those commits just flush, and the block commits once at the end.
+    """
+
+    def __init__(self, session: AsyncSession | None = None) -> None:
+        self._session = session
+        self._depth = 0
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = AsyncSessionFactory()
+        return self._session
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[Self]:
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if not self._depth and self._session is not None:
+                await self._session.rollback()
+            raise
+        self._depth -= 1
+        if not self._depth:
+            await self.commit()
 
     async def commit(self) -> None:
-        await self.session.commit()
+        if self._session is None:
+            return
+        if self._depth:
+            await self._session.flush()
+        else:
+            await self._session.commit()
 
     async def close(self) -> None:
-        await self.session.close()
+        if self._session is not None:
+            await self._session.close()
@@ -1,11 +1,21 @@
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Iterable
 
 from dishka import Provider, Scope, provide
 from redis.asyncio import Redis
 
 from app.core.config import settings
-from app.core.db import AsyncSessionFactory, DbConnection
-from app.services import AuthService, RedisService
+from app.core.db import DbConnection, ReplicaSet, replicas
+from app.core.redis import RedisConnectionPool, create_redis_pool
+from app.services import AuthService, RedisService, SecurityService, UserResolver
+from app.services.cache import ReadThroughCache, SingleFlight
+from app.services.exporter import UserExportService
+from app.services.hashers import PasswordHashers, get_password_hashers
+from app.services.importer import UserImportService
+from app.services.ratelimit import RateLimiter
+from app.services.referrer import ReferrerService
+from app.services.revocation import TokenRevocationList
+from app.services.tokens import RefreshTokenService
+from app.utils.executor import BoundedExecutor
 
 
 class AdaptersProvider(Provider):
@@ -13,15 +23,48 @@ class AdaptersProvider(Provider):
 
     @provide(scope=Scope.REQUEST)
     async def connection(self) -> AsyncGenerator[DbConnection]:
-        session = AsyncSessionFactory()
-        uow = DbConnection(session=session)
+        uow = DbConnection()
         yield uow
         await uow.close()
 
+    @provide(scope=Scope.APP)
+    async def replica_set(self) -> AsyncGenerator[ReplicaSet]:
+        await replicas.start()
+        yield replicas
+        await replicas.stop()
+
+    @provide(scope=Scope.APP)
+    async def redis_pool(self) -> AsyncGenerator[RedisConnectionPool]:
+        pool = create_redis_pool()
+        yield pool
+        await pool.aclose()
+
     @provide(scope=Scope.REQUEST)
-    async def redis(self) -> AsyncGenerator[Redis]:
-        async with Redis.from_url(settings.REDIS_URL) as unit_redis:
-            yield unit_redis
+    def redis(self, pool: RedisConnectionPool) -> Redis:
+        return Redis(connection_pool=pool)
+
+    @provide(scope=Scope.APP)
+    async def token_revocations(self, pool: RedisConnectionPool) -> AsyncGenerator[TokenRevocationList]:
+        revocations = TokenRevocationList(Redis(connection_pool=pool))
+        await revocations.start()
+        yield revocations
+        await revocations.stop()
+
+    single_flight = provide(SingleFlight, scope=Scope.APP)
+
+    @provide(scope=Scope.APP)
+    def password_hash_executor(self) -> Iterable[BoundedExecutor]:
+        executor = BoundedExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS,
+            queue_size=settings.PASSWORD_HASH_QUEUE_SIZE,
+            thread_name_prefix="password-hash",
+        )
+        yield executor
+        executor.shutdown()
+
+    @provide(scope=Scope.APP)
+    def password_hashers(self) -> PasswordHashers:
+        return get_password_hashers()
 
 
 class InteractorProvider(Provider):
@@ -29,3 +72,11 @@ class InteractorProvider(Provider):
 
     auth = provide(AuthService)
     redis_service = provide(RedisService)
+    security_service = provide(SecurityService)
+    refresh_tokens = provide(RefreshTokenService)
+    cache = provide(ReadThroughCache)
+    referrer_service = provide(ReferrerService)
+    user_resolver = provide(UserResolver)
+    rate_limiter = provide(RateLimiter)
+    user_import = provide(UserImportService)
+    user_export = provide(UserExportService)
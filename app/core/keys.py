@@ -0,0 +1,97 @@
+import base64
+import hashlib
+import json
+from pathlib import Path
+
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key, load_pem_public_key
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWTError
+
+from app.core.config import settings
+
+
+def _algorithm_for(public_key) -> str:
+    if isinstance(public_key, rsa.RSAPublicKey):
+        return "RS256"
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(public_key.curve, ec.SECP256R1):
+        return "ES256"
+    raise ValueError(f"Unsupported JWT key type: {type(public_key).__name__}")
+
+
+def _thumbprint(public_jwk: dict) -> str:
+    """RFC 7638 JWK thumbprint, used as the ``kid`` of a key."""
+    members = ("e", "kty", "n") if public_jwk["kty"] == "RSA" else ("crv", "kty", "x", "y")
+    canonical = json.dumps({name: public_jwk[name] for name in members}, separators=(",", ":"), sort_keys=True)
+    digest = hashlib.sha256(canonical.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+class JWTKey:
+    """A signing or verification key, parsed once when the application starts."""
+
+    def __init__(self, algorithm: str, verifying_key: Key, signing_key: Key | None = None, kid: str | None = None):
+        self.algorithm = algorithm
+        self.verifying_key = verifying_key
+        self.signing_key = signing_key
+        self.kid = kid
+
+    @classmethod
+    def from_secret(cls, secret: str, algorithm: str = "HS256") -> "JWTKey":
+        key = jwk.construct(secret, algorithm)
+        return cls(algorithm, verifying_key=key, signing_key=key)
+
+    @classmethod
+    def from_private_pem(cls, pem: bytes) -> "JWTKey":
+        algorithm = _algorithm_for(load_pem_private_key(pem, password=None).public_key())
+        signing_key = jwk.construct(pem, algorithm)
+        verifying_key = signing_key.public_key()
+        return cls(algorithm, verifying_key, signing_key, kid=_thumbprint(verifying_key.to_dict()))
+
+    @classmethod
+    def from_public_pem(cls, pem: bytes) -> "JWTKey":
+        algorithm = _algorithm_for(load_pem_public_key(pem))
+        verifying_key = jwk.construct(pem, algorithm)
+        return cls(algorithm, verifying_key, kid=_thumbprint(verifying_key.to_dict()))
+
+    def public_jwk(self) -> dict:
+        return {**self.verifying_key.to_dict(), "kid": self.kid, "use": "sig"}
+
+
+class KeyRing:
+    """Signs tokens with the active key and verifies them with any key still in rotation.
+
+    Asymmetric tokens carry the ``kid`` of their key, so verification is a dict lookup
+    of an already parsed key; tokens signed with the shared secret carry no ``kid``.
+    """
+
+    def __init__(self, signing_key: JWTKey, previous_keys: list[JWTKey] | None = None) -> None:
+        self.signing_key = signing_key
+        self.keys = {key.kid: key for key in (signing_key, *(previous_keys or []))}
+        self.jwks = {"keys": [key.public_jwk() for key in self.keys.values() if key.kid]}
+
+    def encode(self, claims: dict) -> str:
+        headers = {"kid": self.signing_key.kid} if self.signing_key.kid else None
+        return jwt.encode(claims, self.signing_key.signing_key, algorithm=self.signing_key.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        key = self.keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+
+
+def load_key_ring() -> KeyRing:
+    if settings.JWT_ALGORITHM == "HS256":
+        return KeyRing(JWTKey.from_secret(settings.SECRET_KEY))
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise ValueError(f"JWT_PRIVATE_KEY_FILE is required for {settings.JWT_ALGORITHM} tokens")
+    signing_key = JWTKey.from_private_pem(Path(settings.JWT_PRIVATE_KEY_FILE).read_bytes())
+    if signing_key.algorithm != settings.JWT_ALGORITHM:
+        raise ValueError(f"JWT_PRIVATE_KEY_FILE holds a {signing_key.algorithm} key, not {settings.JWT_ALGORITHM}")
+    previous_keys = [JWTKey.from_public_pem(Path(path).read_bytes()) for path in settings.JWT_PREVIOUS_PUBLIC_KEY_FILES]
+    return KeyRing(signing_key, previous_keys)
+
+
+key_ring = load_key_ring()
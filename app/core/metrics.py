@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import inspect
+import os
+import time
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# sub-millisecond buckets for the in-process hot paths
+FAST_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05, 0.1)
+
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"])
+JWT_DECODE_DURATION = Histogram(
+    "jwt_decode_duration_seconds", "Access token decoding and verification time", buckets=FAST_BUCKETS
+)
+ON_AUTH_DURATION = Histogram("on_auth_duration_seconds", "Time spent in the on_auth callback", buckets=FAST_BUCKETS)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "Password hashing and verification time, queueing included", ["operation"]
+)
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "DAO method latency", ["dao", "method"], buckets=FAST_BUCKETS + (0.25, 0.5, 1, 2.5)
+)
+REDIS_COMMAND_DURATION = Histogram(
+    "redis_command_duration_seconds", "RedisService call latency", ["method"], buckets=FAST_BUCKETS
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Read-through cache lookups", ["result"])
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "Delay of a periodic event-loop tick past its deadline", buckets=FAST_BUCKETS + (0.25, 1)
+)
+DB_POOL_EVENTS = Counter(
+    "db_pool_events_total", "Connection pool connects, checkouts, invalidations, waits and timeouts", ["pool", "event"]
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time a checkout waited for a connection once the pool and its overflow were used up",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+# summed over the live workers when PROMETHEUS_MULTIPROC_DIR is set
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out", ["pool"], multiprocess_mode="livesum"
+)
+
+CACHE_HIT = CACHE_REQUESTS.labels("hit")
+CACHE_NEGATIVE_HIT = CACHE_REQUESTS.labels("negative_hit")
+CACHE_MISS = CACHE_REQUESTS.labels("miss")
+
+
+def render() -> bytes:
+    """Metrics of every worker when PROMETHEUS_MULTIPROC_DIR is set, of this process otherwise."""
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def instrument(histogram: Histogram, *labels: str):
+    """Class decorator timing every public coroutine method, labelled with ``labels`` and the method name."""
+
+    def decorator(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.iscoroutinefunction(method):
+                continue
+            setattr(cls, name, _timed(method, histogram.labels(*labels, name)))
+        return cls
+
+    return decorator
+
+
+def _timed(method, metric):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            metric.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+class MetricsMiddleware:
+    """Records the latency of every HTTP request, labelled with the matched route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self._metrics = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # unmatched paths share one label so scanners can't blow up the series count
+            key = (scope["method"], route.path if route else "unmatched", status)
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = REQUEST_DURATION.labels(*key)
+            metric.observe(time.perf_counter() - started)
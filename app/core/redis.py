@@ -0,0 +1,46 @@
+import time
+
+from redis.asyncio import BlockingConnectionPool
+
+from app.core.config import settings
+from app.schemas.stats import RedisPoolStats
+
+
+class RedisConnectionPool(BlockingConnectionPool):
+    """Blocking connection pool that keeps track of how often callers had to wait for a connection."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.waits = 0
+        self.wait_time = 0.0
+
+    async def get_connection(self, command_name, *keys, **options):
+        if self.can_get_connection():
+            return await super().get_connection(command_name, *keys, **options)
+        self.waits += 1
+        started = time.perf_counter()
+        try:
+            return await super().get_connection(command_name, *keys, **options)
+        finally:
+            self.wait_time += time.perf_counter() - started
+
+    def stats(self) -> RedisPoolStats:
+        in_use = len(self._in_use_connections)
+        return RedisPoolStats(
+            max_connections=self.max_connections,
+            in_use=in_use,
+            idle=len(self._available_connections),
+            waits=self.waits,
+            wait_time=self.wait_time,
+        )
+
+
+def create_redis_pool() -> RedisConnectionPool:
+    return RedisConnectionPool.from_url(
+        settings.REDIS_URL,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_CONNECT_TIMEOUT,
+    )
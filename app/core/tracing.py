@@ -0,0 +1,112 @@
+import functools
+import inspect
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+# the opentelemetry packages are an optional extra, only imported when tracing is enabled
+if settings.TRACING_ENABLED:
+    from opentelemetry import propagate, trace
+
+    tracer = trace.get_tracer("app")
+
+
+def setup_tracing() -> None:
+    from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if settings.TRACING_EXPORTER == "file":
+        exporter = ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE, "a", buffering=1),
+            formatter=lambda span: span.to_json(indent=None) + "\n",
+        )
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        exporter = OTLPSpanExporter()
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: settings.PROJECT_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+
+def shutdown_tracing() -> None:
+    # flushes the spans still queued for export
+    trace.get_tracer_provider().shutdown()
+
+
+def traced(name: str | None = None, attributes: dict | None = None):
+    """Runs the function in a span; returns it unchanged when tracing is disabled."""
+
+    def decorator(func):
+        if not settings.TRACING_ENABLED:
+            return func
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, attributes=attributes):
+                    return await func(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(span_name, attributes=attributes):
+                    return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def traced_methods(attributes: dict | None = None):
+    """Class decorator tracing every public method, see ``traced``."""
+
+    def decorator(cls):
+        if not settings.TRACING_ENABLED:
+            return cls
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(method) or inspect.isasyncgenfunction(method):
+                continue
+            setattr(cls, name, traced(f"{cls.__name__}.{name}", attributes)(method))
+        return cls
+
+    return decorator
+
+
+class TracingMiddleware:
+    """Opens the server span of every HTTP request, continuing the caller's trace when it sent one."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.request.method": scope["method"], "url.path": scope["path"]},
+        ) as span:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.response.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if route := scope.get("route"):
+                    span.update_name(f"{scope['method']} {route.path}")
+                    span.set_attribute("http.route", route.path)
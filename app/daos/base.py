@@ -12,7 +12,7 @@ class BaseDao(Protocol):
         pass
 
     @abstractmethod
-    async def get_all(self):
+    def stream(self):
         pass
 
     @abstractmethod
@@ -0,0 +1,134 @@
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.db import DbConnection
+from app.core.metrics import DB_QUERY_DURATION, instrument
+from app.core.tracing import traced_methods
+from app.daos.base import BaseDao
+from app.models.referrers import Referrer
+from app.models.user import User
+
+# hot lookups are built once; each call only binds its parameters
+_select_by_referrer_id = select(Referrer).where(Referrer.referrer_id == bindparam("referrer_id"))
+_select_by_user_id = select(Referrer).where(Referrer.user_id == bindparam("user_id"))
+_select_by_user_email = (
+    select(User.id, Referrer)
+    .outerjoin(Referrer, Referrer.user_id == User.id)
+    .where(User.email == bindparam("email"))
+    .execution_options(use_replica=True)
+)
+_select_referrals_count = (
+    select(Referrer.referrals_count)
+    .where(Referrer.referrer_id == bindparam("referrer_id"))
+    .execution_options(use_replica=True)
+)
+
+
+@traced_methods({"db.system": "postgresql"})
+@instrument(DB_QUERY_DURATION, "ReferrerDao")
+class ReferrerDao(BaseDao):
+    def __init__(self, db_connection: DbConnection) -> None:
+        self.db_connection = db_connection
+
+    @property
+    def session(self) -> AsyncSession:
+        return self.db_connection.session
+
+    async def create(self, referrer: Referrer) -> Referrer:
+        self.session.add(referrer)
+        await self.db_connection.commit()
+        return referrer
+
+    async def get_by_id(self, referrer_pk: int) -> Referrer | None:
+        statement = select(Referrer).where(Referrer.id == referrer_pk)
+        return await self.session.scalar(statement=statement)
+
+    async def get_by_referrer_id(self, referrer_id: str) -> Referrer | None:
+        return await self.session.scalar(statement=_select_by_referrer_id, params={"referrer_id": referrer_id})
+
+    async def get_by_user_id(self, user_id: int) -> Referrer | None:
+        return await self.session.scalar(statement=_select_by_user_id, params={"user_id": user_id})
+
+    async def get_by_user_email(self, email: str) -> tuple[int, Referrer | None] | None:
+        """The user's id and referrer in one query; ``None`` when there is no such user."""
+        row = (await self.session.execute(statement=_select_by_user_email, params={"email": email})).first()
+        return (row[0], row[1]) if row else None
+
+    async def create_for_user(self, user_id: int, referrer_id: str, until_at: datetime) -> Referrer | None:
+        """Insert the user's referrer, or return ``None`` if the user already has one."""
+        statement = (
+            insert(Referrer)
+            .values(user_id=user_id, referrer_id=referrer_id, until_at=until_at)
+            .on_conflict_do_nothing(index_elements=[Referrer.user_id])
+            .returning(Referrer)
+        )
+        referrer = await self.session.scalar(statement=statement)
+        await self.db_connection.commit()
+        return referrer
+
+    async def delete_for_user(self, user_id: int, referrer_id: str) -> Referrer | None:
+        """Delete the referrer if it belongs to the user and return it, ``None`` if nothing matched."""
+        statement = (
+            delete(Referrer)
+            .where(Referrer.user_id == user_id, Referrer.referrer_id == referrer_id)
+            .returning(Referrer)
+            .execution_options(synchronize_session=False)
+        )
+        referrer = await self.session.scalar(statement=statement)
+        await self.db_connection.commit()
+        return referrer
+
+    async def stream(self, batch_size: int = 1000) -> AsyncIterator[Referrer]:
+        statement = select(Referrer).order_by(Referrer.id).execution_options(yield_per=batch_size, use_replica=True)
+        result = await self.session.stream_scalars(statement=statement)
+        async for referrer in result:
+            yield referrer
+
+    async def delete_all(self) -> None:
+        await self.session.execute(delete(Referrer))
+        await self.db_connection.commit()
+
+    async def get_referrals_count(self, referrer_id: str) -> int | None:
+        return await self.session.scalar(statement=_select_referrals_count, params={"referrer_id": referrer_id})
+
+    async def increment_referrals_count(self, referrer_id: str, by: int = 1) -> None:
+        """Adjust the counter in the caller's transaction; the caller commits."""
+        statement = (
+            update(Referrer)
+            .where(Referrer.referrer_id == referrer_id)
+            .values(referrals_count=Referrer.referrals_count + by)
+        )
+        await self.session.execute(statement=statement)
+
+    async def reset_referrals_count(self) -> None:
+        await self.session.execute(update(Referrer).values(referrals_count=0))
+
+    async def reconcile_referrals_count(self, after_id: int, batch_size: int) -> tuple[int | None, int]:
+        """Recount the referrals of the next ``batch_size`` referrers with ``id > after_id``.
+
+        Returns the last id of the batch (``None`` when there are no referrers left) and the number of
+        counters that had drifted. Each batch is committed on its own so row locks are held briefly.
+        """
+        batch = select(Referrer.id).where(Referrer.id > after_id).order_by(Referrer.id).limit(batch_size).subquery()
+        last_id = await self.session.scalar(select(func.max(batch.c.id)))
+        if last_id is None:
+            return None, 0
+        actual = (
+            select(func.count())
+            .select_from(User)
+            .where(User.referral_id == Referrer.referrer_id)
+            .correlate(Referrer)
+            .scalar_subquery()
+        )
+        statement = (
+            update(Referrer)
+            .where(Referrer.id > after_id, Referrer.id <= last_id, Referrer.referrals_count != actual)
+            .values(referrals_count=actual)
+        )
+        result = await self.session.execute(statement=statement)
+        await self.db_connection.commit()
+        return last_id, result.rowcount
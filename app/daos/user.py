@@ -1,67 +1,167 @@
-from sqlalchemy import delete, exists, func, select, or_
+import json
+from collections import Counter
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+from sqlalchemy import bindparam, delete, exists, or_, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import DbConnection
+from app.core.metrics import DB_QUERY_DURATION, instrument
+from app.core.tracing import traced_methods
 from app.daos.base import BaseDao
+from app.daos.referrer import ReferrerDao
 from app.models.user import User
 from app.schemas.user import UserBase
 
+# hot lookups are built once; each call only binds its parameters.
+# They back registration, login and token authentication, so they stay on the primary: on a lagging replica a
+# just-registered user would be missing, letting a duplicate email through and failing the first login
+_select_by_email = select(User).where(User.email == bindparam("email"))
+_select_by_identity = select(User).where(User.identity == bindparam("identity"))
+_select_exists = exists().where(or_(User.email == bindparam("email"), User.identity == bindparam("identity"))).select()
+# bind parameters PostgreSQL (and asyncpg) accept in one statement
+MAX_BIND_PARAMS = 32767
+
 
+@traced_methods({"db.system": "postgresql"})
+@instrument(DB_QUERY_DURATION, "UserDao")
 class UserDao(BaseDao):
     def __init__(self, db_connection: DbConnection) -> None:
-        self.session = db_connection.session
+        self.db_connection = db_connection
         self.columns = User.__table__.c.keys()
+        self.referrer_dao = ReferrerDao(db_connection=db_connection)
+
+    @property
+    def session(self) -> AsyncSession:
+        return self.db_connection.session
 
     async def create(self, user_data: UserBase) -> User:
         _data = user_data.model_dump(include=set(self.columns))
         _user = User(**_data)
         self.session.add(_user)
-        await self.session.commit()
-        await self.session.refresh(_user)
+        if _user.referral_id:
+            # same transaction as the insert, so the counter never drifts on a failed commit
+            await self.referrer_dao.increment_referrals_count(_user.referral_id)
+        # id and created_at come back from the INSERT's RETURNING, no refresh needed
+        await self.db_connection.commit()
         return _user
 
+    async def bulk_create(self, users_data: list[dict]) -> int:
+        """Insert users with multi-row statements, skipping those whose email or identity is taken.
+
+        Rows are split into as few statements as the bind parameter limit allows, all in one transaction.
+        Returns how many were inserted. Referral counters are bumped in the same transaction.
+        """
+        if not users_data:
+            return 0
+        referral_ids = []
+        rows_per_statement = MAX_BIND_PARAMS // len(self.columns)
+        for start in range(0, len(users_data), rows_per_statement):
+            rows = users_data[start : start + rows_per_statement]
+            statement = insert(User).values(rows).on_conflict_do_nothing().returning(User.referral_id)
+            result = await self.session.execute(statement=statement)
+            referral_ids.extend(result.scalars().all())
+        for referral_id, count in Counter(filter(None, referral_ids)).items():
+            await self.referrer_dao.increment_referrals_count(referral_id, count)
+        await self.db_connection.commit()
+        return len(referral_ids)
+
     async def get_by_id(self, user_id: int) -> User | None:
         statement = select(User).where(User.id == user_id)
         return await self.session.scalar(statement=statement)
 
     async def get_by_email(self, email) -> User | None:
-        statement = select(User).where(User.email == email)
-        return await self.session.scalar(statement=statement)
+        return await self.session.scalar(statement=_select_by_email, params={"email": email})
 
     async def get_by_identity(self, identity: str) -> User | None:
-        statement = select(User).where(User.identity == identity)
+        return await self.session.scalar(statement=_select_by_identity, params={"identity": identity})
+
+    async def get_by_identity_or_email(self, identity: str, email: str) -> User | None:
+        statement = (
+            select(User)
+            .where(or_(User.identity == identity, User.email == email))
+            .order_by((User.identity == identity).desc())
+            .limit(1)
+        )
         return await self.session.scalar(statement=statement)
 
-    async def get_all(self) -> list[User]:
-        statement = select(User).order_by(User.id)
+    async def stream(
+        self,
+        referral_id: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[User]:
+        """Users ordered by id, fetched through a server-side cursor ``batch_size`` rows at a time."""
+        statement = select(User).order_by(User.id).execution_options(yield_per=batch_size, use_replica=True)
+        if referral_id is not None:
+            statement = statement.where(User.referral_id == referral_id)
+        if created_from is not None:
+            statement = statement.where(User.created_at >= created_from)
+        if created_to is not None:
+            statement = statement.where(User.created_at < created_to)
+        result = await self.session.stream_scalars(statement=statement)
+        async for user in result:
+            yield user
+
+    async def get_by_referral_id(self, referral_id: str, limit: int, offset: int) -> list[User]:
+        statement = (
+            select(User)
+            .where(User.referral_id == referral_id)
+            .order_by(User.created_at, User.id)
+            .limit(limit)
+            .offset(offset)
+            .execution_options(use_replica=True)
+        )
         result = await self.session.execute(statement=statement)
         return result.scalars().all()
 
-    async def get_by_referral_id(self, referral_id: str, limit: int, offset: int) -> tuple[int, list[User]]:
-        query = select(
-            User
-        ).filter(User.referral_id == referral_id).limit(limit).offset(offset)
-        result = await self.session.execute(query)
-        total = await self.session.scalar(select(func.count()).select_from(query.subquery()))
+    async def update_password(self, user_id: int, hashed_password: str) -> None:
+        statement = update(User).where(User.id == user_id).values(password=hashed_password)
+        await self.session.execute(statement=statement)
+        await self.db_connection.commit()
+
+    async def get_page_by_referral_id(
+        self,
+        referral_id: str,
+        limit: int,
+        after: tuple[datetime, int] | None = None,
+    ) -> tuple[list[User], bool]:
+        """Keyset page ordered by ``(created_at, id)``; also tells whether more rows follow."""
+        statement = select(User).where(User.referral_id == referral_id)
+        if after:
+            statement = statement.where(tuple_(User.created_at, User.id) > tuple_(*after))
+        statement = statement.order_by(User.created_at, User.id).limit(limit + 1).execution_options(use_replica=True)
+        result = await self.session.execute(statement=statement)
         users = result.scalars().all()
-        return total, users
+        return users[:limit], len(users) > limit
+
+    async def estimate_count_by_referral_id(self, referral_id: str) -> int:
+        """Row count estimated by the query planner, without scanning the rows."""
+        plan = await self.session.scalar(
+            text("EXPLAIN (FORMAT JSON) SELECT 1 FROM users WHERE referral_id = :referral_id").execution_options(
+                use_replica=True
+            ),
+            {"referral_id": referral_id},
+        )
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
 
     async def delete_all(self) -> None:
         await self.session.execute(delete(User))
-        await self.session.commit()
+        await self.referrer_dao.reset_referrals_count()
+        await self.db_connection.commit()
 
     async def delete_by_id(self, user_id: int) -> User | None:
-        _user = await self.get_by_id(user_id=user_id)
-        statement = delete(User).where(User.id == user_id)
-        await self.session.execute(statement=statement)
-        await self.session.commit()
+        statement = delete(User).where(User.id == user_id).returning(User).execution_options(synchronize_session=False)
+        _user = await self.session.scalar(statement=statement)
+        if _user and _user.referral_id:
+            await self.referrer_dao.increment_referrals_count(_user.referral_id, -1)
+        await self.db_connection.commit()
         return _user
 
     async def exists(self, identity: str, email: str) -> bool:
-        return await self.session.scalar(
-            exists(
-                select(User)
-                .where(
-                    or_(User.email == email, User.identity == identity)
-                )
-            ).select()
-        )
+        return await self.session.scalar(statement=_select_exists, params={"email": email, "identity": identity})
@@ -11,7 +11,8 @@ class Referrer(Base):
     __tablename__ = "referrers"
 
     id: Mapped[intpk]
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    # a user has at most one referrer, enforced here so creation can rely on ON CONFLICT
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), unique=True, nullable=False)
     referrer_id: Mapped[str] = mapped_column(String(100), unique=True, nullable=False, index=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(), nullable=False, server_default=func.now())
     until_at: Mapped[datetime] = mapped_column(
@@ -19,3 +20,5 @@ class Referrer(Base):
         nullable=False,
         server_default=text("now() + interval '14 days'")
     )
+    # number of users registered with referrer_id, kept up to date by UserDao and reconciled by a batch job
+    referrals_count: Mapped[int] = mapped_column(nullable=False, default=0, server_default=text("0"))
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import String, func
+from sqlalchemy import Index, String, func
 from sqlalchemy.dialects.postgresql import TIMESTAMP
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -9,11 +9,15 @@ from app.models.base import Base, intpk
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # backs keyset pagination of referrals and plain referral_id lookups
+        Index("ix__users_referral_id_created_at_id", "referral_id", "created_at", "id"),
+    )
 
     id: Mapped[intpk]
     email: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     password: Mapped[str | None] = mapped_column(nullable=True)
     name: Mapped[str] = mapped_column(nullable=False)
     identity: Mapped[str] = mapped_column(nullable=False, unique=True, index=True)
-    referral_id: Mapped[str | None] = mapped_column(String(100), nullable=True, index=True)
+    referral_id: Mapped[str | None] = mapped_column(String(100), nullable=True)
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(), nullable=False, server_default=func.now())
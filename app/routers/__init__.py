@@ -1,11 +1,18 @@
 from fastapi import APIRouter
 
+from .admin import router as admin_router
 from .oauth import router as oauth2_router
 from .auth import router as auth_router
 from .referrers import router as referrers_router
+from .stats import router as stats_router
+from .well_known import router as well_known_router
 
 api_router = APIRouter()
 
 api_router.include_router(oauth2_router, tags=["OAuth2"])
 api_router.include_router(auth_router, tags=["Auth"])
 api_router.include_router(referrers_router, tags=["Referrer"])
+api_router.include_router(stats_router, tags=["Stats"])
+api_router.include_router(admin_router, tags=["Admin"])
+
+__all__ = ["api_router", "well_known_router"]
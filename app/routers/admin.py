@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from datetime import datetime, timezone
+from typing import Annotated
+
+from dishka.integrations.fastapi import DishkaRoute, FromDishka
+
+from app.core.config import settings
+from app.schemas.imports import DataFormat, ImportReport
+from app.services.exporter import UserExportService
+from app.services.importer import UserImportService
+from app.services.users import LOCAL_ID_CLAIM
+
+MEDIA_TYPES = {
+    DataFormat.ndjson: "application/x-ndjson",
+    DataFormat.csv: "text/csv",
+}
+
+
+def require_admin(request: Request) -> None:
+    if not request.user.is_authenticated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": "Unauthorized",
+                    "error_description": "Could not validate credentials"}
+        )
+    # the local id claim is set by this service, unlike the email, which anyone can register unverified
+    if request.user.get(LOCAL_ID_CLAIM) not in settings.ADMIN_USER_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={"error": "Forbidden",
+                    "error_description": "Admin access required"}
+        )
+
+
+router = APIRouter(route_class=DishkaRoute, prefix="/admin", dependencies=[Depends(require_admin)])
+
+
+@router.post("/users/import")
+async def import_users(
+    request: Request,
+    user_import: FromDishka[UserImportService],
+    format: DataFormat = DataFormat.ndjson,
+    # 5 columns per row, asyncpg allows at most 32767 bind parameters per statement
+    batch_size: Annotated[int | None, Query(gt=0, le=5000)] = None,
+) -> ImportReport:
+    """Import users from the raw request body, NDJSON or CSV with a header line."""
+    return await user_import.run(request.stream(), format, batch_size)
+
+
+def _naive_utc(value: datetime | None) -> datetime | None:
+    # created_at is stored without a time zone, in UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+@router.get("/users/export")
+async def export_users(
+    user_export: FromDishka[UserExportService],
+    format: DataFormat = DataFormat.ndjson,
+    referral_id: Annotated[str | None, Query(max_length=100)] = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+) -> StreamingResponse:
+    """Stream users created in ``[created_from, created_to)``, ordered by id."""
+    return StreamingResponse(
+        user_export.export(format, referral_id, _naive_utc(created_from), _naive_utc(created_to)),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format.value}"'},
+    )
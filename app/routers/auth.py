@@ -1,37 +1,72 @@
 from typing import Annotated
 from dishka.integrations.fastapi import DishkaRoute, FromDishka
-from fastapi import APIRouter, Form, Request
-from fastapi.responses import RedirectResponse
+from fastapi import APIRouter, Form, HTTPException, Request, status
+from fastapi.responses import JSONResponse, RedirectResponse, Response
 from pydantic import EmailStr
 
+from app.core.config import settings
+from app.models.user import User
+from app.schemas.token import TokenPair
 from app.schemas.user import UserIn
 from app.services.auth import AuthService
+from app.services.ratelimit import RateLimiter
+from app.services.revocation import TokenRevocationList
+from app.services.tokens import RefreshTokenService
+from app.services.users import LOCAL_ID_CLAIM
 
 router = APIRouter(route_class=DishkaRoute, prefix="/auth")
 
+REFRESH_COOKIE = "Refresh"
+# the refresh token is only ever sent to /auth/refresh and /auth/logout
+REFRESH_COOKIE_PATH = f"{settings.BASE_PATH_PREFIX}/auth"
 
-@router.post("/login")
-async def login(
-    request: Request,
-    email: Annotated[EmailStr, Form()],
-    password: Annotated[str, Form(min_length=8)],
-    auth_service: FromDishka[AuthService],
-):
-    user = await auth_service.login(email, password)
-    access_token = request.auth.jwt_create({
-        "id": user.id,
+
+def user_claims(user: User) -> dict:
+    return {
+        LOCAL_ID_CLAIM: user.id,
         "identity": user.identity,
         "email": user.email,
-    })
-    response = RedirectResponse("/")
+    }
+
+
+def set_auth_cookies(request: Request, response: Response, access_token: str, refresh_token: str) -> None:
     response.set_cookie(
         "Authorization",
         value=f"Bearer {access_token}",
         max_age=request.auth.expires,
         expires=request.auth.expires,
+        secure=not request.auth.http,
         httponly=request.auth.http,
         samesite=request.auth.same_site,
     )
+    response.set_cookie(
+        REFRESH_COOKIE,
+        value=refresh_token,
+        max_age=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+        expires=settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60,
+        path=REFRESH_COOKIE_PATH,
+        secure=not request.auth.http,
+        httponly=True,
+        samesite=request.auth.same_site,
+    )
+
+
+@router.post("/login")
+async def login(
+    request: Request,
+    email: Annotated[EmailStr, Form()],
+    password: Annotated[str, Form(min_length=8)],
+    auth_service: FromDishka[AuthService],
+    refresh_tokens: FromDishka[RefreshTokenService],
+    rate_limiter: FromDishka[RateLimiter],
+):
+    await rate_limiter.check("login", request, email=email)
+    user = await auth_service.login(email, password)
+    claims = user_claims(user)
+    access_token = request.auth.jwt_create(claims)
+    refresh_token = await refresh_tokens.issue(claims)
+    response = RedirectResponse("/")
+    set_auth_cookies(request, response, access_token, refresh_token)
     return response
 
 
@@ -40,27 +75,52 @@ async def register(
     request: Request,
     user_data: UserIn,
     auth_service: FromDishka[AuthService],
+    refresh_tokens: FromDishka[RefreshTokenService],
+    rate_limiter: FromDishka[RateLimiter],
 ):
+    await rate_limiter.check("register", request, email=user_data.email)
     user = await auth_service.register_user(user_data)
-    access_token = request.auth.jwt_create({
-        "id": user.id,
-        "identity": user.identity,
-        "email": user.email,
-    })
+    claims = user_claims(user)
+    access_token = request.auth.jwt_create(claims)
+    refresh_token = await refresh_tokens.issue(claims)
     response = RedirectResponse("/")
-    response.set_cookie(
-        "Authorization",
-        value=f"Bearer {access_token}",
-        max_age=request.auth.expires,
-        expires=request.auth.expires,
-        httponly=request.auth.http,
-        samesite=request.auth.same_site,
+    set_auth_cookies(request, response, access_token, refresh_token)
+    return response
+
+
+@router.post("/refresh", response_model=TokenPair)
+async def refresh(
+    request: Request,
+    refresh_tokens: FromDishka[RefreshTokenService],
+    refresh_token: Annotated[str | None, Form()] = None,
+):
+    refresh_token = refresh_token or request.cookies.get(REFRESH_COOKIE)
+    if not refresh_token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": "Unauthorized", "error_description": "Refresh token not provided"},
+        )
+    claims, refresh_token = await refresh_tokens.rotate(refresh_token)
+    access_token = request.auth.jwt_create(claims)
+    response = JSONResponse(
+        TokenPair(access_token=access_token, token_type="bearer", refresh_token=refresh_token).model_dump()
     )
+    set_auth_cookies(request, response, access_token, refresh_token)
     return response
 
 
 @router.get("/logout")
-async def logout(request: Request):
+async def logout(
+    request: Request,
+    refresh_tokens: FromDishka[RefreshTokenService],
+    revocations: FromDishka[TokenRevocationList],
+):
+    if request.user.get("jti"):
+        await revocations.revoke(request.user["jti"], request.user["exp"])
+    refresh_token = request.cookies.get(REFRESH_COOKIE)
+    if refresh_token:
+        await refresh_tokens.revoke(refresh_token)
     response = RedirectResponse("/")
     response.delete_cookie("Authorization")
+    response.delete_cookie(REFRESH_COOKIE, path=REFRESH_COOKIE_PATH)
     return response
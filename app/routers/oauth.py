@@ -1,10 +1,17 @@
+from dishka.integrations.fastapi import DishkaRoute, FromDishka
 from fastapi import APIRouter
 from fastapi.responses import RedirectResponse
 from starlette.requests import Request
 
+from fastapi_oauth2.middleware import User
+
+from app.routers.auth import REFRESH_COOKIE_PATH, set_auth_cookies
+from app.services.auth import AuthService
 from app.services.security import OAuth2Providers
+from app.services.tokens import RefreshTokenService
+from app.services.users import LOCAL_ID_CLAIM
 
-router = APIRouter(prefix="/oauth2")
+router = APIRouter(route_class=DishkaRoute, prefix="/oauth2")
 
 
 @router.get("/{provider}/authorize")
@@ -15,14 +22,32 @@ def authorize(request: Request, provider: OAuth2Providers):
 
 
 @router.get("/{provider}/token")
-async def token(request: Request, provider: OAuth2Providers):
-    if request.auth.ssr:
-        return await request.auth.clients[provider.value].token_redirect(request)
-    return await request.auth.clients[provider.value].token_data(request)
+async def token(
+    request: Request,
+    provider: OAuth2Providers,
+    auth_service: FromDishka[AuthService],
+    refresh_tokens: FromDishka[RefreshTokenService],
+):
+    client = request.auth.clients[provider.value]
+    token_data = await client.token_data(request)
+    # provision the user once here, so authenticating later requests never needs the database
+    claims = User(token_data).use_claims(client.claims)
+    user = await auth_service.provision_user(
+        email=claims.email, name=claims.name or claims.email, identity=claims.identity
+    )
+    # the provider's "id" stays untouched, the identity claim is derived from it
+    token_data[LOCAL_ID_CLAIM] = user.id
+    if not request.auth.ssr:
+        return token_data
+    access_token = request.auth.jwt_create(token_data)
+    refresh_token = await refresh_tokens.issue(token_data)
+    response = RedirectResponse(client.redirect_uri or request.base_url)
+    set_auth_cookies(request, response, access_token, refresh_token)
+    return response
 
 
 @router.get("/logout")
-def logout(request: Request):
-    response = RedirectResponse(request.base_url)
-    response.delete_cookie("Authorization")
-    return response
+async def logout():
+    # the refresh cookie is scoped to the /auth routes and never reaches this one; /auth/logout revokes the
+    # access token and the refresh token family and clears both cookies
+    return RedirectResponse(f"{REFRESH_COOKIE_PATH}/logout")
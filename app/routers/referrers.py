@@ -5,132 +5,101 @@ from typing import Annotated
 from dishka.integrations.fastapi import DishkaRoute, FromDishka
 from fastapi import APIRouter, HTTPException, Query, Request, status
 from pydantic import EmailStr
-from sqlalchemy import and_, delete, exists, select
 
 from app.core.db import DbConnection
+from app.daos.referrer import ReferrerDao
 from app.daos.user import UserDao
-from app.models.referrers import Referrer
+from app.schemas.referrer import ReferrerSnapshot, ReferrerStats
 from app.schemas.user import UserOut
-from app.schemas.utils import ReferrerIdCommonParams, ResponseOffsetPagination
-from app.services.redis import RedisService
+from app.schemas.utils import (
+    CountMode,
+    ReferrerIdCommonParams,
+    ReferrerIdCursorParams,
+    ReferrerIdParam,
+    ResponseCursorPagination,
+    ResponseOffsetPagination,
+)
+from app.services.referrer import ReferrerService
+from app.services.users import LOCAL_ID_CLAIM, UserResolver
+from app.utils.cursor import decode_cursor, encode_cursor
 
 router = APIRouter(route_class=DishkaRoute, tags=[
                    "Referrer"], prefix="/referrer")
 
 
+async def _current_user_id(request: Request, user_resolver: UserResolver) -> int:
+    if not request.user.is_authenticated:
+        raise _unauthorized()
+    # only tokens issued by this service carry the local id; "id" may be the provider's own user id
+    user_id = request.user.get(LOCAL_ID_CLAIM)
+    if user_id:
+        return user_id
+    user = await user_resolver.get_current(request.user)
+    if not user:
+        raise _unauthorized()
+    return user.id
+
+
+def _unauthorized() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail={"error": "Unauthorized",
+                "error_description": "Could not validate credentials"}
+    )
+
+
 @router.post("/create")
 async def create_referrer(
     request: Request,
     until_at: datetime,
+    referrer_service: FromDishka[ReferrerService],
+    user_resolver: FromDishka[UserResolver],
     db: FromDishka[DbConnection],
 ):
-    if request.user.is_authenticated:
-        user = await UserDao(db_connection=db).get_by_email(request.user.email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail={"error": "Unauthorized",
-                        "error_description": "Could not validate credentials"}
-            )
-        if await db.session.scalar(
-            exists(
-                select(Referrer)
-                .where(
-                    Referrer.user_id == user.id
-                )
-            ).select()
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"error": "Bad Request",
-                        "error_description": "Referrer ID already exists, you can only have one referrer ID"}
-            )
-        else:
-            ref_id = ''.join(secrets.choice(
-                string.ascii_letters + string.digits) for _ in range(10))
-            db.session.add(
-                Referrer(
-                    user_id=user.id,
-                    referrer_id=ref_id,
-                    until_at=until_at or datetime.now(
-                        timezone.utc) + timedelta(days=14),
-                )
-            )
-            await db.session.commit()
-            return {"ref_id": ref_id}
-    else:
+    user_id = await _current_user_id(request, user_resolver)
+    ref_id = ''.join(secrets.choice(
+        string.ascii_letters + string.digits) for _ in range(10))
+    _referrer = await ReferrerDao(db_connection=db).create_for_user(
+        user_id,
+        ref_id,
+        until_at or datetime.now(timezone.utc) + timedelta(days=14),
+    )
+    if not _referrer:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": "Unauthorized",
-                    "error_description": "Could not validate credentials"}
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Bad Request",
+                    "error_description": "Referrer ID already exists, you can only have one referrer ID"}
         )
+    # drop a cached miss for the new code
+    await referrer_service.invalidate(ref_id)
+    return {"ref_id": ref_id}
 
 
 @router.post("/delete")
 async def delete_referrer(
     request: Request,
     referrer_id: str,
-    redis_service: FromDishka[RedisService],
+    referrer_service: FromDishka[ReferrerService],
+    user_resolver: FromDishka[UserResolver],
     db: FromDishka[DbConnection],
 ):
-    if request.user.is_authenticated:
-        user = await UserDao(db_connection=db).get_by_email(request.user.email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail={"error": "Unauthorized",
-                        "error_description": "Could not validate credentials"}
-            )
-        if not await db.session.scalar(
-            exists(
-                select(Referrer)
-                .where(
-                    Referrer.user_id == user.id
-                )
-            ).select()
-        ):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"error": "Bad Request",
-                        "error_description": "Referrer ID does not exists for the user"}
-            )
-        _referrer = await db.session.scalar(
-            select(Referrer)
-            .where(
-                Referrer.referrer_id == referrer_id
-            )
-        )
-        if not _referrer:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"error": "Bad Request",
-                        "error_description": "Referrer ID does not exists"}
-            )
-        if _referrer.user_id != user.id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail={"error": "Bad Request",
-                        "error_description": "Referrer ID does not belongs to the user"}
-            )
-        await db.session.execute(
-            delete(Referrer).where(
-                and_(
-                    Referrer.user_id == user.id,
-                    Referrer.referrer_id == referrer_id
-                )
-            )
-        )
-        await db.session.commit()
-        cache = await redis_service.get_cache(key=referrer_id)
-        if cache:
-            await redis_service.delete_cache(key=referrer_id)
+    user_id = await _current_user_id(request, user_resolver)
+    referrer_dao = ReferrerDao(db_connection=db)
+    if await referrer_dao.delete_for_user(user_id, referrer_id):
+        await referrer_service.invalidate(referrer_id)
         return {"message": "Referrer ID deleted"}
+    # nothing was deleted, find out why
+    if not await referrer_dao.get_by_user_id(user_id):
+        error_description = "Referrer ID does not exists for the user"
+    elif not await referrer_dao.get_by_referrer_id(referrer_id):
+        error_description = "Referrer ID does not exists"
     else:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={"error": "Unauthorized",
-                    "error_description": "Could not validate credentials"}
-        )
+        error_description = "Referrer ID does not belongs to the user"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail={"error": "Bad Request",
+                "error_description": error_description}
+    )
 
 
 @router.get("/get_referrer")
@@ -138,34 +107,21 @@ async def get_referrer(
     email: Annotated[EmailStr, Query()],
     db: FromDishka[DbConnection],
 ):
-    user = await UserDao(db_connection=db).get_by_email(email)
-    if not user:
+    found = await ReferrerDao(db_connection=db).get_by_user_email(email)
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"error": "Bad Request",
                     "error_description": "User does not exists"}
         )
-    if not await db.session.scalar(
-        exists(
-            select(Referrer)
-            .where(
-                Referrer.user_id == user.id
-            )
-        ).select()
-    ):
+    _, _referrer = found
+    if not _referrer:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"error": "Bad Request",
                     "error_description": "Referrer ID does not exists for the user"}
         )
-    _referrer = await db.session.scalar(
-        select(Referrer)
-        .where(
-            and_(Referrer.user_id == user.id,
-                 Referrer.until_at > datetime.now(timezone.utc))
-        )
-    )
-    if not _referrer:
+    if not ReferrerSnapshot.model_validate(_referrer).is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"error": "Bad Request",
@@ -177,23 +133,77 @@ async def get_referrer(
 @router.get("/get_referrals")
 async def get_referrals(
     filter_query: Annotated[ReferrerIdCommonParams, Query()],
+    referrer_service: FromDishka[ReferrerService],
     db: FromDishka[DbConnection],
 ) -> ResponseOffsetPagination[UserOut]:
-    _referrer = await db.session.scalar(
-        select(Referrer)
-        .where(
-            Referrer.referrer_id == filter_query.referrer_id
-        )
-    )
+    _referrer = await referrer_service.get_by_referrer_id(filter_query.referrer_id)
     if not _referrer:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail={"error": "Bad Request",
                     "error_description": "Referrer ID does not exists"}
         )
-    total, users = await UserDao(db_connection=db).get_by_referral_id(
+    total = await ReferrerDao(db_connection=db).get_referrals_count(filter_query.referrer_id)
+    if total is None:
+        # the referrer was deleted after it was cached
+        total = 0
+    users = await UserDao(db_connection=db).get_by_referral_id(
         filter_query.referrer_id,
         filter_query.limit,
         filter_query.offset
     )
     return ResponseOffsetPagination(total=total, offset=filter_query.offset, limit=filter_query.limit, items=users)
+
+
+@router.get("/get_referrals/cursor")
+async def get_referrals_by_cursor(
+    filter_query: Annotated[ReferrerIdCursorParams, Query()],
+    referrer_service: FromDishka[ReferrerService],
+    db: FromDishka[DbConnection],
+) -> ResponseCursorPagination[UserOut]:
+    try:
+        after = decode_cursor(filter_query.cursor) if filter_query.cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Bad Request",
+                    "error_description": "Invalid cursor"}
+        )
+    _referrer = await referrer_service.get_by_referrer_id(filter_query.referrer_id)
+    if not _referrer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Bad Request",
+                    "error_description": "Referrer ID does not exists"}
+        )
+    user_dao = UserDao(db_connection=db)
+    users, has_more = await user_dao.get_page_by_referral_id(filter_query.referrer_id, filter_query.limit, after)
+    next_cursor = encode_cursor(users[-1].created_at, users[-1].id) if has_more else None
+    total = None
+    if filter_query.count == CountMode.exact:
+        # the maintained counter, not a COUNT(*) over the referrals
+        total = await ReferrerDao(db_connection=db).get_referrals_count(filter_query.referrer_id)
+    elif filter_query.count == CountMode.estimate:
+        total = await user_dao.estimate_count_by_referral_id(filter_query.referrer_id)
+    return ResponseCursorPagination(limit=filter_query.limit, next_cursor=next_cursor, total=total, items=users)
+
+
+@router.get("/stats")
+async def get_referrer_stats(
+    filter_query: Annotated[ReferrerIdParam, Query()],
+    db: FromDishka[DbConnection],
+) -> ReferrerStats:
+    _referrer = await ReferrerDao(db_connection=db).get_by_referrer_id(filter_query.referrer_id)
+    if not _referrer:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": "Bad Request",
+                    "error_description": "Referrer ID does not exists"}
+        )
+    return ReferrerStats(
+        referrer_id=_referrer.referrer_id,
+        referrals_count=_referrer.referrals_count,
+        created_at=_referrer.created_at,
+        until_at=_referrer.until_at,
+        is_active=ReferrerSnapshot.model_validate(_referrer).is_active,
+    )
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends
+
+from dishka.integrations.fastapi import DishkaRoute, FromDishka
+
+from app.core.db import engine, replicas
+from app.core.redis import RedisConnectionPool
+from app.routers.admin import require_admin
+from app.schemas.stats import CacheStats, DbPoolStats, RedisPoolStats, ReplicaStats
+from app.services.security import known_identities, verified_tokens
+
+# pool sizes, replica hosts and cache stats are internal details, admins only
+router = APIRouter(route_class=DishkaRoute, prefix="/stats", dependencies=[Depends(require_admin)])
+
+
+@router.get("/redis_pool")
+async def redis_pool_stats(pool: FromDishka[RedisConnectionPool]) -> RedisPoolStats:
+    return pool.stats()
+
+
+@router.get("/db_pool")
+async def db_pool_stats() -> DbPoolStats:
+    return engine.pool.stats()
+
+
+@router.get("/db_replicas")
+async def db_replicas_stats() -> list[ReplicaStats]:
+    return replicas.stats()
+
+
+@router.get("/auth_caches")
+async def auth_caches_stats() -> dict[str, CacheStats]:
+    return {
+        "verified_tokens": verified_tokens.stats(),
+        "known_identities": known_identities.stats(),
+    }
@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+import json
+
+from app.core.keys import key_ring
+
+router = APIRouter(prefix="/.well-known")
+
+_jwks = json.dumps(key_ring.jwks).encode()
+
+
+@router.get("/jwks.json", include_in_schema=False)
+async def jwks() -> Response:
+    # verifiers refetch on an unknown kid, so a short max-age is enough to pick up rotations
+    return Response(_jwks, media_type="application/json", headers={"Cache-Control": "public, max-age=300"})
@@ -0,0 +1,34 @@
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class DataFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class RejectedRow(BaseModel):
+    line: int
+    error: str
+
+
+class ImportBatchReport(BaseModel):
+    batch: int
+    received: int
+    inserted: int
+    # valid rows whose email or identity already exists
+    duplicates: int
+    rejected: int
+    seconds: float
+    rows_per_second: float
+
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    batches: list[ImportBatchReport] = []
+    # the first MAX_REPORTED_REJECTS rejected rows
+    rejected_rows: list[RejectedRow] = []
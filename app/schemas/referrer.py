@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ReferrerSnapshot(BaseModel):
+    id: int
+    user_id: int
+    referrer_id: str
+    created_at: datetime
+    until_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @property
+    def is_active(self) -> bool:
+        # timestamps are stored without a time zone, in UTC
+        until_at = self.until_at if self.until_at.tzinfo else self.until_at.replace(tzinfo=timezone.utc)
+        return until_at > datetime.now(timezone.utc)
+
+
+class ReferrerStats(BaseModel):
+    referrer_id: str
+    referrals_count: int
+    created_at: datetime
+    until_at: datetime
+    is_active: bool
@@ -0,0 +1,40 @@
+from pydantic import BaseModel
+
+
+class RedisPoolStats(BaseModel):
+    max_connections: int
+    in_use: int
+    idle: int
+    waits: int
+    # total seconds spent waiting for a free connection
+    wait_time: float
+
+
+class DbPoolStats(BaseModel):
+    size: int
+    checked_out: int
+    idle: int
+    # connections open beyond size
+    overflow: int
+    max_overflow: int
+    connects: int
+    checkouts: int
+    invalidations: int
+    waits: int
+    # total seconds spent waiting for a free connection
+    wait_time: float
+    timeouts: int
+
+
+class ReplicaStats(BaseModel):
+    host: str
+    healthy: bool
+    pool: DbPoolStats
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
@@ -8,3 +8,12 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: EmailStr
+
+
+class TokenPair(Token):
+    refresh_token: str
+
+
+class RefreshTokenRecord(BaseModel):
+    claims: dict
+    family: str
@@ -16,5 +16,10 @@ class UserIn(UserBase):
     password: Annotated[str, StringConstraints(min_length=8)]
 
 
+class UserImport(UserBase):
+    # imported accounts may sign in through an OAuth2 provider only
+    password: Annotated[str, StringConstraints(min_length=8)] | None = None
+
+
 class UserOut(UserBase):
     id: int
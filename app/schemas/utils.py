@@ -13,6 +13,20 @@ class ResponseOffsetPagination(BaseModel, Generic[T]):
     items: list[T]
 
 
+class ResponseCursorPagination(BaseModel, Generic[T]):
+    limit: int
+    next_cursor: str | None
+    # only filled in when requested, see CountMode
+    total: int | None = None
+    items: list[T]
+
+
+class CountMode(str, Enum):
+    none = "none"
+    estimate = "estimate"
+    exact = "exact"
+
+
 class CommonQueryParams(BaseModel):
     limit: int = Field(100, gt=0, le=100)
     offset: int = Field(0, ge=0)
@@ -26,6 +40,16 @@ class ReferrerIdCommonParams(CommonQueryParams, ReferrerIdParam):
     pass
 
 
+class CursorQueryParams(BaseModel):
+    limit: int = Field(100, gt=0, le=100)
+    cursor: str | None = Field(None, max_length=200)
+    count: CountMode = CountMode.none
+
+
+class ReferrerIdCursorParams(CursorQueryParams, ReferrerIdParam):
+    pass
+
+
 class OrderBy(str, Enum):
     asc = "asc"
     desc = "desc"
@@ -1,9 +1,11 @@
 from .auth import AuthService
 from .redis import RedisService
 from .security import SecurityService
+from .users import UserResolver
 
 __all__ = [
     "AuthService",
     "SecurityService",
     "RedisService",
+    "UserResolver",
 ]
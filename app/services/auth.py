@@ -1,27 +1,35 @@
-from datetime import datetime, timezone
 from fastapi import HTTPException, status
 
 import logging
 
-from jose import JWTError, jwt
-from sqlalchemy import and_, select
+from jose import JWTError
 
-from app.core.config import settings
-from app.core.db import DbConnection
+from app.core.db import AsyncSessionFactory, DbConnection
+from app.core.keys import key_ring
+from app.core.tracing import traced_methods
 from app.daos.user import UserDao
-from app.models.referrers import Referrer
 from app.models.user import User as UserModel
 from app.schemas.token import TokenData
-from app.schemas.user import UserIn
-from app.services.redis import RedisService
+from app.schemas.user import UserBase, UserIn
+from app.services.referrer import ReferrerService
 from app.services.security import SecurityService
+from app.services.users import UserResolver
+from app.utils.tasks import spawn
 
 
+@traced_methods()
 class AuthService:
-    def __init__(self, db_connection: DbConnection, redis_service: RedisService):
-        self.session = db_connection.session
-        self.redis_service = redis_service
-        self.security_service = SecurityService()
+    def __init__(
+        self,
+        db_connection: DbConnection,
+        referrer_service: ReferrerService,
+        security_service: SecurityService,
+        user_resolver: UserResolver,
+    ):
+        self.db_connection = db_connection
+        self.referrer_service = referrer_service
+        self.security_service = security_service
+        self.user_resolver = user_resolver
         self.user_dao = UserDao(db_connection=db_connection)
 
     async def register_user(self, user_data: UserIn) -> UserModel:
@@ -34,47 +42,55 @@ class AuthService:
                         "error_description": "User already exists"},
             )
 
-        if user_data.referrer_id:
-            cache = await self.redis_service.get_cache(key=user_data.referrer_id)
-            if cache:
-                cache: Referrer
-                if cache.until_at < datetime.now(timezone.utc):
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail={"error": "Bad Request",
-                                "error_description": "Referrer ID has expired"},
-                    )
-            else:
-                referrer = await self.session.scalar(
-                    select(Referrer)
-                    .where(
-                        and_(Referrer.referrer_id == user_data.referrer_id,
-                             Referrer.until_at > datetime.now(timezone.utc))
-                    )
+        if user_data.referral_id:
+            referrer = await self.referrer_service.get_by_referrer_id(user_data.referral_id)
+            if not referrer or not referrer.is_active:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={"error": "Bad Request",
+                            "error_description": "Referrer ID does not exists or has expired"},
                 )
-                if not referrer:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail={"error": "Bad Request",
-                                "error_description": "Referrer ID does not exists or has expired"},
-                    )
-                await self.redis_service.set_cache(
-                    key=user_data.referrer_id, value=referrer)
-
-        user_data.password = self.security_service.get_password_hash(
+
+        user_data.password = await self.security_service.get_password_hash(
             user_data.password)
         new_user = await self.user_dao.create(user_data)
         logging.info(f"New user created successfully: {new_user}!!!")
         return new_user
 
     async def authenticate_user(self, email: str, password: str) -> UserModel | bool:
-        _user = await self.user_dao.get_by_email(email)
-        if not _user or not self.security_service.verify_password(password, _user.password):
+        _user = await self.user_resolver.get_by_email(email)
+        if not _user or not _user.password:
+            return False
+        if not await self.security_service.verify_password(password, _user.password):
             return False
+        if self.security_service.needs_rehash(_user.password):
+            spawn(self._rehash_password(_user.id, password))
+        return _user
+
+    async def _rehash_password(self, user_id: int, password: str) -> None:
+        """Upgrade a hash made with an outdated algorithm or cost, outside of the login request."""
+        try:
+            hashed_password = await self.security_service.get_password_hash(password)
+        except HTTPException:
+            # hashing pool is saturated, the hash will be upgraded on a later login
+            return
+        try:
+            async with AsyncSessionFactory() as session:
+                await UserDao(db_connection=DbConnection(session=session)).update_password(user_id, hashed_password)
+        except Exception:
+            logging.exception(f"Failed to upgrade password hash for user {user_id}")
+
+    async def provision_user(self, email: str, name: str, identity: str) -> UserModel:
+        """Return the user behind an external identity, creating it on first sign-in."""
+        async with self.db_connection.transaction():
+            _user = await self.user_dao.get_by_identity_or_email(identity, email)
+            if not _user:
+                _user = await self.user_dao.create(UserBase(email=email, name=name, identity=identity))
+        self.user_resolver.remember(_user)
         return _user
 
     async def user_email_exists(self, email: str) -> UserModel | None:
-        _user = await self.user_dao.get_by_email(email)
+        _user = await self.user_resolver.get_by_email(email)
         return _user if _user else None
 
     async def login(self, email: str, password: str) -> UserModel:
@@ -96,15 +112,14 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[
-                                 self.security_service.ALGORITHM])
+            payload = key_ring.decode(token)
             email: str = payload.get("sub")
             if not email:
                 raise credentials_exception
             token_data = TokenData(email=email)
         except JWTError:
             raise credentials_exception
-        _user = await self.user_dao.get_by_email(email=token_data.email)
+        _user = await self.user_resolver.get_by_email(token_data.email)
         if not _user:
             raise credentials_exception
         return _user
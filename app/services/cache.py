@@ -0,0 +1,112 @@
+import asyncio
+import random
+import secrets
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+from app.core.config import settings
+from app.core.metrics import CACHE_HIT, CACHE_MISS, CACHE_NEGATIVE_HIT
+from app.services.codecs import Codec
+from app.services.redis import RedisService
+
+T = TypeVar("T")
+
+# stored instead of a value when the loader found nothing
+MISSING = b"\x00missing"
+
+# deletes a lock only if it still holds our token: it may have expired and been taken by another worker
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key within this worker into a single one."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # a caller giving up must not cancel the load the others are waiting for
+        return await asyncio.shield(call)
+
+
+class ReadThroughCache:
+    """Redis read-through cache with negative caching and stampede protection.
+
+    Misses are cached too (for ``CACHE_NEGATIVE_TTL`` seconds) so lookups of unknown keys don't reach
+    the database every time. On a miss only one caller per worker runs the loader, and across workers
+    a short Redis lock lets a single loader populate the key while the others poll for its result.
+    TTLs are jittered so keys written together don't expire together.
+
+    A loader's result is shared with every concurrent caller of the worker, from any request, so loaders
+    must not use request-scoped state such as the request's database session.
+    """
+
+    def __init__(self, redis_service: RedisService, single_flight: SingleFlight) -> None:
+        self.redis_service = redis_service
+        self.single_flight = single_flight
+
+    @staticmethod
+    def _jittered(ttl: int) -> int:
+        jitter = settings.CACHE_TTL_JITTER
+        return max(1, round(ttl * random.uniform(1 - jitter, 1 + jitter)))
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[T | None]],
+        codec: Codec[T],
+        ttl: int | None = None,
+    ) -> T | None:
+        cached = await self.redis_service.get_value(key)
+        if cached == MISSING:
+            CACHE_NEGATIVE_HIT.inc()
+            return None
+        if cached is not None:
+            value = codec.decode(cached)
+            if value is not None:
+                CACHE_HIT.inc()
+                return value
+        CACHE_MISS.inc()
+        return await self.single_flight.do(key, lambda: self._load(key, loader, codec, ttl))
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[T | None]], codec: Codec[T], ttl: int | None):
+        lock_key = f"lock:{key}"
+        lock_token = secrets.token_hex(16)
+        lock_timeout = settings.CACHE_LOCK_TIMEOUT
+        locked = await self.redis_service.set_value(lock_key, lock_token, ttl=lock_timeout, nx=True)
+        if not locked:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + lock_timeout
+            while loop.time() < deadline:
+                await asyncio.sleep(0.05)
+                cached = await self.redis_service.get_value(key)
+                if cached == MISSING:
+                    return None
+                if cached is not None and (value := codec.decode(cached)) is not None:
+                    return value
+            # the lock holder did not finish in time, load it ourselves
+        try:
+            value = await loader()
+            if value is None:
+                await self.redis_service.set_value(key, MISSING, ttl=self._jittered(settings.CACHE_NEGATIVE_TTL))
+            else:
+                await self.redis_service.set_value(
+                    key, codec.encode(value), ttl=self._jittered(ttl or self.redis_service.ttl)
+                )
+            return value
+        finally:
+            if locked:
+                await self.redis_service.eval_script(RELEASE_LOCK_SCRIPT, [lock_key], lock_token)
+
+    async def invalidate(self, *keys: str) -> None:
+        await self.redis_service.delete(*keys)
@@ -0,0 +1,48 @@
+from abc import abstractmethod
+from typing import Protocol, TypeVar
+
+import orjson
+from pydantic import BaseModel, ValidationError
+
+from app.schemas.referrer import ReferrerSnapshot
+from app.schemas.token import RefreshTokenRecord
+
+T = TypeVar("T")
+M = TypeVar("M", bound=BaseModel)
+
+
+class Codec(Protocol[T]):
+    @abstractmethod
+    def encode(self, value: T) -> bytes:
+        raise NotImplementedError
+
+    @abstractmethod
+    def decode(self, data: bytes) -> T | None:
+        raise NotImplementedError
+
+
+class ModelCodec(Codec[M]):
+    """Stores a pydantic model as orjson prefixed with its schema version.
+
+    Bump the version whenever the model changes: values written by another version decode to ``None``
+    and are treated as a cache miss instead of failing after a deploy. So do corrupt or truncated values.
+    """
+
+    def __init__(self, model: type[M], version: int) -> None:
+        self.model = model
+        self.prefix = f"{model.__name__}:v{version}:".encode()
+
+    def encode(self, value: M) -> bytes:
+        return self.prefix + orjson.dumps(value.model_dump())
+
+    def decode(self, data: bytes) -> M | None:
+        if not data.startswith(self.prefix):
+            return None
+        try:
+            return self.model.model_validate(orjson.loads(data[len(self.prefix):]))
+        except (orjson.JSONDecodeError, ValidationError):
+            return None
+
+
+referrer_codec = ModelCodec(ReferrerSnapshot, version=1)
+refresh_token_codec = ModelCodec(RefreshTokenRecord, version=1)
@@ -0,0 +1,58 @@
+import csv
+import io
+from collections.abc import AsyncIterator
+from datetime import datetime
+
+import orjson
+
+from app.core.db import DbConnection
+from app.daos.user import UserDao
+from app.models.user import User
+from app.schemas.imports import DataFormat
+
+EXPORT_FIELDS = ("id", "email", "name", "identity", "referral_id", "created_at")
+
+
+class UserExportService:
+    """Streams users as NDJSON or CSV, holding at most one database batch and one output chunk in memory."""
+
+    def __init__(self, db_connection: DbConnection) -> None:
+        self.user_dao = UserDao(db_connection=db_connection)
+
+    async def export(
+        self,
+        fmt: DataFormat,
+        referral_id: str | None = None,
+        created_from: datetime | None = None,
+        created_to: datetime | None = None,
+        chunk_rows: int = 500,
+    ) -> AsyncIterator[bytes]:
+        """Yield the export in chunks of ``chunk_rows`` users, the format's header first."""
+        encode = self._ndjson_lines if fmt == DataFormat.ndjson else self._csv_lines
+        users = self.user_dao.stream(referral_id, created_from, created_to)
+        if fmt == DataFormat.csv:
+            yield self._csv_lines([EXPORT_FIELDS])
+        rows = []
+        async for user in users:
+            rows.append(self._row(user))
+            if len(rows) >= chunk_rows:
+                yield encode(rows)
+                rows = []
+        if rows:
+            yield encode(rows)
+
+    @staticmethod
+    def _row(user: User) -> tuple:
+        return tuple(getattr(user, field) for field in EXPORT_FIELDS)
+
+    @staticmethod
+    def _ndjson_lines(rows: list[tuple]) -> bytes:
+        return b"".join(orjson.dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in rows)
+
+    @staticmethod
+    def _csv_lines(rows: list[tuple]) -> bytes:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(
+            (value.isoformat() if isinstance(value, datetime) else value for value in row) for row in rows
+        )
+        return buffer.getvalue().encode()
@@ -0,0 +1,119 @@
+from abc import abstractmethod
+from collections.abc import Callable
+from typing import Protocol
+
+import bcrypt
+from argon2 import PasswordHasher as Argon2PasswordHasher
+from argon2 import Type
+from argon2.exceptions import InvalidHashError, VerificationError
+
+from app.core.config import settings
+
+
+class PasswordHasher(Protocol):
+    name: str
+
+    @abstractmethod
+    def identify(self, hashed_password: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def verify(self, password: str, hashed_password: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def needs_rehash(self, hashed_password: str) -> bool:
+        raise NotImplementedError
+
+
+class BcryptHasher(PasswordHasher):
+    name = "bcrypt"
+
+    def __init__(self, rounds: int = 12) -> None:
+        self.rounds = rounds
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith(("$2a$", "$2b$", "$2y$"))
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password=password.encode("utf-8"), salt=salt).decode("utf-8")
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password=password.encode("utf-8"), hashed_password=hashed_password.encode("utf-8"))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        # $2b$<rounds>$<salt+hash>
+        return int(hashed_password.split("$")[2]) != self.rounds
+
+
+class Argon2idHasher(PasswordHasher):
+    name = "argon2id"
+
+    def __init__(self, time_cost: int = 3, memory_cost: int = 64 * 1024, parallelism: int = 4) -> None:
+        self._hasher = Argon2PasswordHasher(
+            time_cost=time_cost,
+            memory_cost=memory_cost,
+            parallelism=parallelism,
+            type=Type.ID,
+        )
+
+    def identify(self, hashed_password: str) -> bool:
+        return hashed_password.startswith("$argon2id$")
+
+    def hash(self, password: str) -> str:
+        return self._hasher.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        try:
+            return self._hasher.verify(hashed_password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return self._hasher.check_needs_rehash(hashed_password)
+
+
+class PasswordHashers:
+    """Hashes with the configured algorithm and verifies against any registered one.
+
+    A stored hash needs an upgrade when it was made by another algorithm or with other cost parameters.
+    """
+
+    def __init__(self, default: PasswordHasher, *others: PasswordHasher) -> None:
+        self.default = default
+        self.hashers = (default, *others)
+
+    def identify(self, hashed_password: str) -> PasswordHasher | None:
+        return next((hasher for hasher in self.hashers if hasher.identify(hashed_password)), None)
+
+    def hash(self, password: str) -> str:
+        return self.default.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        hasher = self.identify(hashed_password)
+        return hasher is not None and hasher.verify(password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        hasher = self.identify(hashed_password)
+        return hasher is not self.default or hasher.needs_rehash(hashed_password)
+
+
+HASHERS: dict[str, Callable[[], PasswordHasher]] = {
+    "bcrypt": lambda: BcryptHasher(rounds=settings.BCRYPT_ROUNDS),
+    "argon2id": lambda: Argon2idHasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+}
+
+
+def get_password_hashers() -> PasswordHashers:
+    default = HASHERS[settings.PASSWORD_HASHER]()
+    others = [factory() for name, factory in HASHERS.items() if name != settings.PASSWORD_HASHER]
+    return PasswordHashers(default, *others)
@@ -0,0 +1,178 @@
+import asyncio
+import csv
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+
+import orjson
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.core.db import DbConnection
+from app.daos.user import UserDao
+from app.models.user import User
+from app.schemas.imports import DataFormat, ImportBatchReport, ImportReport, RejectedRow
+from app.schemas.user import UserImport
+from app.services.hashers import PasswordHashers
+from app.utils.executor import BoundedExecutor, ExecutorSaturated
+
+MAX_REPORTED_REJECTS = 1000
+
+# optional CSV columns left empty mean "not set"
+_NULLABLE_FIELDS = ("password", "referral_id")
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into lines without reading it all into memory."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode(errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode(errors="replace").rstrip("\r")
+
+
+class UserImportService:
+    """Bulk user import from NDJSON or CSV, one record per line.
+
+    Records are validated, hashed and inserted ``batch_size`` at a time, each batch in its own
+    transaction, so a failure part way leaves the earlier batches imported. Invalid rows are reported
+    with their line number and skipped; rows whose email or identity already exists are counted as
+    duplicates.
+    """
+
+    def __init__(self, db_connection: DbConnection, executor: BoundedExecutor, hashers: PasswordHashers) -> None:
+        self.user_dao = UserDao(db_connection=db_connection)
+        self.executor = executor
+        self.hashers = hashers
+        self.columns = set(User.__table__.c.keys())
+
+    async def run(
+        self,
+        chunks: AsyncIterable[bytes],
+        fmt: DataFormat,
+        batch_size: int | None = None,
+        on_batch: Callable[[ImportBatchReport, list[RejectedRow]], None] | None = None,
+    ) -> ImportReport:
+        batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        report = ImportReport()
+        started = time.perf_counter()
+        batch: list[tuple[int, dict | None, str | None]] = []
+        async for record in self._records(iter_lines(chunks), fmt):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                await self._import_batch(batch, report, on_batch)
+                batch = []
+        if batch:
+            await self._import_batch(batch, report, on_batch)
+        report.seconds = round(time.perf_counter() - started, 3)
+        return report
+
+    async def _import_batch(
+        self,
+        batch: list[tuple[int, dict | None, str | None]],
+        report: ImportReport,
+        on_batch: Callable[[ImportBatchReport, list[RejectedRow]], None] | None,
+    ) -> None:
+        started = time.perf_counter()
+        users, rejected = [], []
+        for line, record, error in batch:
+            if error is None:
+                try:
+                    users.append(UserImport.model_validate(record))
+                    continue
+                except ValidationError as exc:
+                    error = "; ".join(f"{'.'.join(map(str, e['loc'])) or 'record'}: {e['msg']}" for e in exc.errors())
+            rejected.append(RejectedRow(line=line, error=error))
+
+        hashed = await self._hash_passwords([user.password for user in users])
+        users_data = []
+        for user, password in zip(users, hashed):
+            user.password = password
+            users_data.append(user.model_dump(include=self.columns))
+        inserted = await self.user_dao.bulk_create(users_data)
+
+        seconds = time.perf_counter() - started
+        batch_report = ImportBatchReport(
+            batch=len(report.batches) + 1,
+            received=len(batch),
+            inserted=inserted,
+            duplicates=len(users_data) - inserted,
+            rejected=len(rejected),
+            seconds=round(seconds, 3),
+            rows_per_second=round(len(batch) / seconds, 1) if seconds else 0.0,
+        )
+        report.batches.append(batch_report)
+        report.inserted += batch_report.inserted
+        report.duplicates += batch_report.duplicates
+        report.rejected += batch_report.rejected
+        report.rejected_rows.extend(rejected[: MAX_REPORTED_REJECTS - len(report.rejected_rows)])
+        if on_batch:
+            on_batch(batch_report, rejected)
+
+    async def _hash_passwords(self, passwords: list[str | None]) -> list[str | None]:
+        semaphore = asyncio.Semaphore(max(1, min(settings.IMPORT_HASH_CONCURRENCY, self.executor.max_workers)))
+
+        async def _hash(password: str | None) -> str | None:
+            if password is None:
+                return None
+            async with semaphore:
+                while True:
+                    try:
+                        return await self.executor.run(self.hashers.hash, password)
+                    except ExecutorSaturated:
+                        # logins have priority on the shared pool, back off and retry
+                        await asyncio.sleep(0.05)
+
+        return await asyncio.gather(*map(_hash, passwords))
+
+    @staticmethod
+    async def _records(
+        lines: AsyncIterator[str], fmt: DataFormat
+    ) -> AsyncIterator[tuple[int, dict | None, str | None]]:
+        """Yield ``(line number, record, parse error)`` for every non-empty record.
+
+        A CSV record may span lines inside a quoted field; it is reported with the number of its first line.
+        """
+        header = None
+        line_number = 0
+        # CSV record read so far and the line it started on, while a quoted field is still open
+        pending, pending_line = None, 0
+        async for line in lines:
+            line_number += 1
+            if pending is None and not line.strip():
+                continue
+            if fmt == DataFormat.ndjson:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError as exc:
+                    yield line_number, None, f"invalid JSON: {exc}"
+                    continue
+                if not isinstance(record, dict):
+                    yield line_number, None, "record must be a JSON object"
+                    continue
+                yield line_number, record, None
+            else:
+                if pending is None:
+                    pending, pending_line = line, line_number
+                else:
+                    pending = f"{pending}\n{line}"
+                # quotes inside a field are doubled, so the record is complete once they are balanced
+                if pending.count('"') % 2:
+                    continue
+                values = next(csv.reader([pending]))
+                pending = None
+                if header is None:
+                    header = [name.strip() for name in values]
+                    continue
+                if len(values) != len(header):
+                    yield pending_line, None, f"expected {len(header)} columns, got {len(values)}"
+                    continue
+                record = dict(zip(header, values))
+                for field in _NULLABLE_FIELDS:
+                    if record.get(field) == "":
+                        record[field] = None
+                yield pending_line, record, None
+        if pending is not None:
+            yield pending_line, None, "unterminated quoted field"
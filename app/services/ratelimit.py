@@ -0,0 +1,109 @@
+from fastapi import HTTPException, Request, status
+
+import hashlib
+import logging
+import math
+from functools import lru_cache
+
+from redis.asyncio import Redis
+from redis.exceptions import NoScriptError, RedisError
+
+from app.core.config import settings
+from app.utils.ratelimit import TokenBuckets
+
+PERIODS = {"second": 1, "minute": 60, "hour": 60 * 60, "day": 24 * 60 * 60}
+
+# GCRA over every key at once, using the Redis clock: a request is allowed only if all keys allow it,
+# and only then are they all charged. Returns {allowed, milliseconds to wait}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local tats = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local period = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', key)) or now
+    if tat < now then tat = now end
+    tats[i] = tat + interval
+    wait = math.max(wait, tats[i] - period - now)
+end
+if wait > 0 then
+    return {0, math.ceil(wait)}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('SET', key, tostring(tats[i]), 'PX', math.ceil(tats[i] - now))
+end
+return {1, 0}
+"""
+GCRA_SHA = hashlib.sha1(GCRA_SCRIPT.encode()).hexdigest()
+
+local_buckets = TokenBuckets(settings.RATE_LIMIT_LOCAL_KEYS)
+
+
+def client_ip(request: Request) -> str | None:
+    """The address the per-IP limits apply to.
+
+    Behind ``RATE_LIMIT_TRUSTED_PROXY_HOPS`` proxies it is the X-Forwarded-For entry added by the outermost
+    one; entries to its left come from the client and can be forged.
+    """
+    if hops := settings.RATE_LIMIT_TRUSTED_PROXY_HOPS:
+        forwarded = [ip.strip() for value in request.headers.getlist("x-forwarded-for") for ip in value.split(",")]
+        if len(forwarded) >= hops and forwarded[-hops]:
+            return forwarded[-hops]
+    return request.client.host if request.client else None
+
+
+@lru_cache
+def parse_rate(rate: str) -> tuple[int, int]:
+    """``"5/minute"`` -> ``(5, 60)``."""
+    limit, period = rate.split("/")
+    return int(limit), PERIODS[period.strip()]
+
+
+class RateLimiter:
+    """Distributed rate limits from ``RATE_LIMITS``, checked in one Redis round trip.
+
+    Limits are configured per route and key kind (``ip``, ``email``). If Redis is unavailable requests
+    are let through rather than locking everyone out.
+    """
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+
+    async def check(self, route: str, request: Request, email: str | None = None) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        identifiers = {"ip": client_ip(request), "email": email and email.lower()}
+        rules = []
+        for kind, value in identifiers.items():
+            rate = settings.RATE_LIMITS.get(f"{route}:{kind}")
+            if value and rate:
+                rules.append((f"ratelimit:{route}:{kind}:{value}", *parse_rate(rate)))
+        if not rules:
+            return
+
+        for key, limit, period in rules:
+            if retry_after := local_buckets.take(key, limit, period):
+                raise self._too_many_requests(retry_after)
+
+        keys = [key for key, _, _ in rules]
+        args = [value for _, limit, period in rules for value in (period * 1000 / limit, period * 1000)]
+        try:
+            try:
+                allowed, wait_ms = await self._redis.evalsha(GCRA_SHA, len(keys), *keys, *args)
+            except NoScriptError:
+                allowed, wait_ms = await self._redis.eval(GCRA_SCRIPT, len(keys), *keys, *args)
+        except RedisError:
+            logging.warning("Rate limit check skipped, Redis is unavailable")
+            return
+        if not allowed:
+            raise self._too_many_requests(wait_ms / 1000)
+
+    @staticmethod
+    def _too_many_requests(retry_after: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail={"error": "Too Many Requests", "error_description": "Rate limit exceeded, try again later"},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
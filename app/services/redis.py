@@ -1,10 +1,25 @@
-import pickle
+import hashlib
+from functools import lru_cache
+from typing import TypeVar
 
 from redis.asyncio import Redis
+from redis.exceptions import NoScriptError
 
 from app.core.config import settings
+from app.core.metrics import REDIS_COMMAND_DURATION, instrument
+from app.core.tracing import traced_methods
+from app.services.codecs import Codec
 
+T = TypeVar("T")
 
+
+@lru_cache
+def _script_sha(script: str) -> str:
+    return hashlib.sha1(script.encode()).hexdigest()
+
+
+@traced_methods({"db.system": "redis"})
+@instrument(REDIS_COMMAND_DURATION)
 class RedisService:
     def __init__(self, redis: Redis) -> None:
         self._redis = redis
@@ -13,18 +28,36 @@ class RedisService:
     async def ping(self):
         return await self._redis.ping()
 
-    async def set_cache(self, key: str, value: object, pickle_dump: bool = True):
-        if pickle_dump:
-            value = pickle.dumps(value)
-        return await self._redis.set(key, value, ex=self.ttl)
+    async def set_cache(self, key: str, value: T, codec: Codec[T], ttl: int | None = None):
+        return await self._redis.set(key, codec.encode(value), ex=ttl or self.ttl)
 
-    async def get_cache(self, key: str, pickle_dump: bool = True) -> object:
+    async def get_cache(self, key: str, codec: Codec[T]) -> T | None:
         value = await self._redis.get(key)
-        if not value:
+        if value is None:
             return None
-        if pickle_dump:
-            value = pickle.loads(value)
-        return value
+        return codec.decode(value)
 
     async def delete_cache(self, key: str):
         return await self._redis.delete(key)
+
+    async def get_value(self, key: str) -> bytes | None:
+        return await self._redis.get(key)
+
+    async def set_value(self, key: str, value: bytes | str, ttl: int | None = None, nx: bool = False, xx: bool = False):
+        return await self._redis.set(key, value, ex=ttl or self.ttl, nx=nx, xx=xx)
+
+    async def pop_value(self, key: str) -> bytes | None:
+        return await self._redis.getdel(key)
+
+    async def exists(self, *keys: str) -> int:
+        return await self._redis.exists(*keys)
+
+    async def delete(self, *keys: str) -> int:
+        return await self._redis.delete(*keys)
+
+    async def eval_script(self, script: str, keys: list[str], *args):
+        """Run a Lua script by its SHA1, sending the source only when Redis doesn't have it cached yet."""
+        try:
+            return await self._redis.evalsha(_script_sha(script), len(keys), *keys, *args)
+        except NoScriptError:
+            return await self._redis.eval(script, len(keys), *keys, *args)
@@ -0,0 +1,53 @@
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from app.core.db import DbConnection
+from app.daos.referrer import ReferrerDao
+from app.models.referrers import Referrer
+from app.schemas.referrer import ReferrerSnapshot
+from app.services.cache import ReadThroughCache
+from app.services.codecs import referrer_codec
+
+
+@asynccontextmanager
+async def _own_referrer_dao() -> AsyncIterator[ReferrerDao]:
+    # cache loads are shared with concurrent callers from other requests and may outlive the request that
+    # started them, so they run on a connection of their own rather than the request's
+    db_connection = DbConnection()
+    try:
+        yield ReferrerDao(db_connection=db_connection)
+    finally:
+        await db_connection.close()
+
+
+class ReferrerService:
+    """Referrer lookups through the read-through cache.
+
+    Snapshots are cached whether or not the referrer is still active; callers check ``is_active``.
+    """
+
+    def __init__(self, cache: ReadThroughCache) -> None:
+        self.cache = cache
+
+    @staticmethod
+    def _referrer_key(referrer_id: str) -> str:
+        return f"referrer:{referrer_id}"
+
+    @staticmethod
+    def _snapshot(referrer: Referrer | None) -> ReferrerSnapshot | None:
+        return ReferrerSnapshot.model_validate(referrer) if referrer else None
+
+    @classmethod
+    async def _load_by_referrer_id(cls, referrer_id: str) -> ReferrerSnapshot | None:
+        async with _own_referrer_dao() as referrer_dao:
+            return cls._snapshot(await referrer_dao.get_by_referrer_id(referrer_id))
+
+    async def get_by_referrer_id(self, referrer_id: str) -> ReferrerSnapshot | None:
+        return await self.cache.get_or_load(
+            self._referrer_key(referrer_id),
+            lambda: self._load_by_referrer_id(referrer_id),
+            codec=referrer_codec,
+        )
+
+    async def invalidate(self, referrer_id: str) -> None:
+        await self.cache.invalidate(self._referrer_key(referrer_id))
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import time
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.utils.bloom import BloomFilter
+
+
+class TokenRevocationList:
+    """Denylist of revoked access token ids (``jti``).
+
+    Redis is the source of truth: every revoked jti is stored with a TTL equal to the remaining life of its
+    token and announced on a pub/sub channel. Each worker mirrors the denylist into a Bloom filter kept up to
+    date from that channel, so a request only pays a Redis round trip when the filter says "maybe revoked".
+    Until the filter is in sync (startup, lost subscription) every check goes to Redis.
+    """
+
+    CHANNEL = "revoked_jti"
+    KEY_PREFIX = "revoked_jti:"
+
+    def __init__(self, redis: Redis) -> None:
+        self._redis = redis
+        self._filter = self._new_filter()
+        self._rebuilding: BloomFilter | None = None
+        self._synced = False
+        self._task: asyncio.Task | None = None
+
+    @staticmethod
+    def _new_filter() -> BloomFilter:
+        return BloomFilter(settings.REVOCATION_FILTER_CAPACITY, settings.REVOCATION_FILTER_ERROR_RATE)
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._sync())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def revoke(self, jti: str, expires_at: int) -> None:
+        ttl = int(expires_at - time.time())
+        if ttl <= 0:
+            return
+        self._add(jti)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.set(f"{self.KEY_PREFIX}{jti}", 1, ex=ttl)
+            pipe.publish(self.CHANNEL, jti)
+            await pipe.execute()
+
+    async def is_revoked(self, jti: str) -> bool:
+        """Raises ``RedisError`` when Redis had to be asked and failed, unless ``REVOCATION_FAIL_OPEN`` is set.
+
+        Unlike the rate limiter, which fails open since a missed throttle only costs capacity, accepting a
+        token that was revoked defeats logout, so failing closed is the default.
+        """
+        if self._synced and jti not in self._filter:
+            return False
+        try:
+            return bool(await self._redis.exists(f"{self.KEY_PREFIX}{jti}"))
+        except RedisError:
+            if not settings.REVOCATION_FAIL_OPEN:
+                raise
+            logging.warning("Token revocation check failed, accepting token %s", jti, exc_info=True)
+            return False
+
+    def _add(self, jti: str) -> None:
+        self._filter.add(jti)
+        if self._rebuilding is not None:
+            self._rebuilding.add(jti)
+
+    async def _rebuild(self) -> None:
+        """Reload the filter from Redis, dropping ids whose tokens have expired since."""
+        self._rebuilding = self._new_filter()
+        try:
+            async for key in self._redis.scan_iter(match=f"{self.KEY_PREFIX}*", count=1000):
+                self._rebuilding.add(key.decode().removeprefix(self.KEY_PREFIX))
+            self._filter = self._rebuilding
+        finally:
+            self._rebuilding = None
+
+    async def _sync(self) -> None:
+        while True:
+            try:
+                async with self._redis.pubsub() as pubsub:
+                    # subscribe before loading so nothing revoked in between is missed
+                    await pubsub.subscribe(self.CHANNEL)
+                    await self._rebuild()
+                    self._synced = True
+                    rebuild_at = time.monotonic() + settings.REVOCATION_FILTER_REBUILD_INTERVAL
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None:
+                            self._add(message["data"].decode())
+                        if time.monotonic() >= rebuild_at:
+                            await self._rebuild()
+                            rebuild_at = time.monotonic() + settings.REVOCATION_FILTER_REBUILD_INTERVAL
+            except (Exception, asyncio.CancelledError):
+                # only stop() ends the task; a stray CancelledError from the connection is retried like any error
+                if asyncio.current_task().cancelling():
+                    raise
+                logging.exception("Token revocation subscription lost, retrying")
+            finally:
+                # whatever ended the subscription, revocations may have been missed since
+                self._synced = False
+            await asyncio.sleep(1)
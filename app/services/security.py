@@ -1,45 +1,81 @@
 from enum import Enum
-from typing import Awaitable, Callable, Tuple
+from typing import Awaitable, Callable, Tuple, TypeVar
 from fastapi import HTTPException, Request, status
 from fastapi.openapi.models import HTTPBearer as HTTPBearerModel
 from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.security.http import HTTPBase
 from fastapi.security.utils import get_authorization_scheme_param
 from jose import JOSEError
+from redis.exceptions import RedisError
 
 from starlette.middleware.authentication import AuthenticationMiddleware
 from starlette.authentication import AuthenticationBackend
 from starlette.requests import HTTPConnection
 from starlette.authentication import AuthenticationError
-from starlette.responses import Response
+from starlette.responses import JSONResponse, Response
 from starlette.types import Scope, Send, Receive, ASGIApp
 
 from fastapi_oauth2.middleware import Auth, User
 from fastapi_oauth2.config import OAuth2Config
 from fastapi_oauth2.core import OAuth2Core
 
-from dishka import Scope as DIScope
-
 from datetime import datetime
 from datetime import timezone
+import hashlib
+import secrets
+import time
 
-import bcrypt
-
+from app.core.config import settings
 from app.core.db import DbConnection
+from app.core.keys import key_ring
+from app.core.metrics import JWT_DECODE_DURATION, ON_AUTH_DURATION, PASSWORD_HASH_DURATION
+from app.core.tracing import traced, traced_methods
 from app.daos.user import UserDao
 from app.schemas.user import UserBase
+from app.services.hashers import PasswordHashers
+from app.services.revocation import TokenRevocationList
+from app.services.users import UserResolver
+from app.utils.cache import LRUCache
+from app.utils.executor import BoundedExecutor, ExecutorSaturated
+
+T = TypeVar("T")
 
+# sha256(token) -> verified claims
+verified_tokens: LRUCache[bytes, dict] = LRUCache(settings.JWT_CACHE_SIZE)
 
+_hash_duration = PASSWORD_HASH_DURATION.labels("hash")
+_verify_duration = PASSWORD_HASH_DURATION.labels("verify")
+
+
+@traced_methods()
 class SecurityService:
-    def get_password_hash(self, password: str) -> str:
-        pwd_bytes = password.encode("utf-8")
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
-        return hashed_password.decode("utf-8")
+    """Runs password hashing on a bounded worker pool so it never blocks the event loop."""
+
+    def __init__(self, executor: BoundedExecutor, hashers: PasswordHashers) -> None:
+        self.executor = executor
+        self.hashers = hashers
 
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        password_byte_enc = plain_password.encode("utf-8")
-        return bcrypt.checkpw(password=password_byte_enc, hashed_password=hashed_password.encode("utf-8"))
+    async def get_password_hash(self, password: str) -> str:
+        with _hash_duration.time():
+            return await self._run(self.hashers.hash, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        with _verify_duration.time():
+            return await self._run(self.hashers.verify, plain_password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return self.hashers.needs_rehash(hashed_password)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        try:
+            return await self.executor.run(func, *args)
+        except ExecutorSaturated:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail={"error": "Service Unavailable",
+                        "error_description": "Too many password operations in progress, try again later"},
+                headers={"Retry-After": "1"},
+            )
 
 
 class HTTPBearer(HTTPBase):
@@ -82,6 +118,19 @@ class OAuth2Providers(str, Enum):
     google = "google-oauth2"
 
 
+class JWTAuth(Auth):
+    """Auth credentials that sign and verify tokens with the application key ring."""
+
+    @classmethod
+    def jwt_encode(cls, data: dict) -> str:
+        # a unique id lets a single token be revoked before it expires
+        return key_ring.encode({**data, "jti": secrets.token_urlsafe(16)})
+
+    @classmethod
+    def jwt_decode(cls, token: str) -> dict:
+        return key_ring.decode(token)
+
+
 class OAuth2Backend(AuthenticationBackend):
     """Authentication backend for AuthenticationMiddleware."""
 
@@ -102,7 +151,8 @@ class OAuth2Backend(AuthenticationBackend):
         }
         self.callback = callback
 
-    async def authenticate(self, request: Request) -> Tuple[Auth, User] | None:
+    @traced("OAuth2Middleware.authenticate")
+    async def authenticate(self, request: Request) -> Tuple[JWTAuth, User] | None:
         authorization = request.headers.get(
             "Authorization",
             request.cookies.get("Authorization"),
@@ -110,26 +160,66 @@ class OAuth2Backend(AuthenticationBackend):
         scheme, param = get_authorization_scheme_param(authorization)
 
         if not scheme or not param:
-            return Auth(), User()
+            return JWTAuth(), User()
 
         try:
-            token_data = Auth.jwt_decode(param)
+            with JWT_DECODE_DURATION.time():
+                token_data = self.jwt_decode(param)
         except JOSEError as e:
             raise AuthenticationError(str(e))
         if token_data["exp"] and token_data["exp"] < int(datetime.now(timezone.utc).timestamp()):
             raise AuthenticationError("Token expired")
+        if token_data.get("jti"):
+            revocations = await request.app.state.dishka_container.get(TokenRevocationList)
+            try:
+                revoked = await revocations.is_revoked(token_data["jti"])
+            except RedisError:
+                raise AuthenticationUnavailable("Could not check whether the token was revoked, try again later")
+            if revoked:
+                raise AuthenticationError("Token revoked")
 
         user = User(token_data)
-        auth = Auth(user.pop("scope", []))
+        auth = JWTAuth(user.pop("scope", []))
         auth.provider = auth.clients.get(user.get("provider"))
         claims = auth.provider.claims if auth.provider else {}
 
         if callable(self.callback):
-            coroutine = self.callback(auth, user.use_claims(claims), request)
-            if issubclass(type(coroutine), Awaitable):
-                await coroutine
+            with ON_AUTH_DURATION.time():
+                coroutine = self.callback(auth, user.use_claims(claims), request)
+                if issubclass(type(coroutine), Awaitable):
+                    await coroutine
         return auth, user.use_claims(claims)
 
+    @staticmethod
+    def jwt_decode(token: str) -> dict:
+        """Decode and verify a token, reusing the claims of tokens verified before.
+
+        Only signature verification is memoized; expiry and revocation are still checked on every request.
+        """
+        key = hashlib.sha256(token.encode()).digest()
+        token_data = verified_tokens.get(key)
+        if token_data is None:
+            token_data = JWTAuth.jwt_decode(token)
+            expires_at = time.time() + settings.JWT_CACHE_TTL
+            if token_data.get("exp"):
+                expires_at = min(expires_at, token_data["exp"])
+            verified_tokens.set(key, token_data, expires_at)
+        return token_data
+
+
+class AuthenticationUnavailable(AuthenticationError):
+    """The credentials could not be checked because a service they depend on is down."""
+
+
+def on_auth_error(conn: HTTPConnection, exc: AuthenticationError) -> Response:
+    if isinstance(exc, AuthenticationUnavailable):
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"error": "Service Unavailable", "error_description": str(exc)},
+            headers={"Retry-After": "1"},
+        )
+    return AuthenticationMiddleware.default_on_error(conn, exc)
+
 
 class OAuth2Middleware:
     """Wrapper for the Starlette AuthenticationMiddleware."""
@@ -154,7 +244,7 @@ class OAuth2Middleware:
         elif not isinstance(config, OAuth2Config):
             raise TypeError("config is not a valid type")
         self.default_application_middleware = app
-        on_error = on_error or AuthenticationMiddleware.default_on_error
+        on_error = on_error or on_auth_error
         self.auth_middleware = AuthenticationMiddleware(app, backend=OAuth2Backend(config, callback), on_error=on_error)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
@@ -163,11 +253,24 @@ class OAuth2Middleware:
         await self.default_application_middleware(scope, receive, send)
 
 
+known_identities: LRUCache[str, bool] = LRUCache(settings.AUTH_KNOWN_IDENTITIES_SIZE)
+
+
+@traced()
 async def on_auth(auth: Auth, user: User, request: Request):
-    context = {Request: request}
-    di_scope = DIScope.REQUEST
-    async with request.app.state.dishka_container(context, scope=di_scope) as container:
+    if not settings.AUTH_PROVISION_ON_REQUEST or not user.identity:
+        return
+    if known_identities.get(user.identity):
+        return
+    # ContainerMiddleware wraps the authentication middleware, so the request container already exists
+    # and the user loaded here is reused by the handler
+    container = request.state.dishka_container
+    user_resolver = await container.get(UserResolver)
+    if not await user_resolver.get_current(user):
         conn = await container.get(DbConnection)
         user_dao = UserDao(db_connection=conn)
-        if user.identity and not await user_dao.exists(user.identity, user.email):
-            await user_dao.create(UserBase(email=user.email, name=user.name, identity=user.identity))
+        async with conn.transaction():
+            if not await user_dao.exists(user.identity, user.email):
+                _user = await user_dao.create(UserBase(email=user.email, name=user.name, identity=user.identity))
+                user_resolver.remember(_user)
+    known_identities.set(user.identity, True)
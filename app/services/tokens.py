@@ -0,0 +1,92 @@
+from fastapi import HTTPException, status
+
+import hashlib
+import secrets
+
+from app.core.config import settings
+from app.schemas.token import RefreshTokenRecord
+from app.services.codecs import refresh_token_codec
+from app.services.redis import RedisService
+
+# Consume a token, keeping its record under the "used" key so a replay can find its family. Both happen in one
+# step: a replay racing the rotation must see either the token or the marker, never neither.
+# Returns {1, record} when the token was consumed now, {0, record or nil} when it had been used before.
+CONSUME_SCRIPT = """
+local data = redis.call('GET', KEYS[1])
+if data then
+    redis.call('DEL', KEYS[1])
+    redis.call('SET', KEYS[2], data, 'EX', ARGV[1])
+    return {1, data}
+end
+return {0, redis.call('GET', KEYS[2])}
+"""
+
+
+class RefreshTokenService:
+    """Opaque, single-use refresh tokens stored in Redis.
+
+    Every refresh token belongs to a family started at login. Using a token rotates it: the old one
+    is consumed and a new one of the same family is issued. Presenting an already consumed token means
+    it was stolen or replayed, so the whole family is revoked and every holder has to log in again.
+    """
+
+    def __init__(self, redis_service: RedisService) -> None:
+        self.redis_service = redis_service
+        self.ttl = settings.REFRESH_TOKEN_EXPIRE_MINUTES * 60
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _token_key(digest: str) -> str:
+        return f"refresh_token:{digest}"
+
+    @staticmethod
+    def _used_key(digest: str) -> str:
+        return f"refresh_token_used:{digest}"
+
+    @staticmethod
+    def _family_key(family: str) -> str:
+        return f"refresh_family:{family}"
+
+    async def issue(self, claims: dict, family: str | None = None) -> str:
+        if family is None:
+            family = secrets.token_urlsafe(16)
+            await self.redis_service.set_value(self._family_key(family), b"1", ttl=self.ttl)
+        elif not await self.redis_service.set_value(self._family_key(family), b"1", ttl=self.ttl, xx=True):
+            # revoked, possibly by a replay racing this rotation; never bring a family back
+            raise self._invalid_token()
+        token = secrets.token_urlsafe(32)
+        record = RefreshTokenRecord(claims=claims, family=family)
+        await self.redis_service.set_cache(
+            self._token_key(self._digest(token)), record, codec=refresh_token_codec, ttl=self.ttl
+        )
+        return token
+
+    async def rotate(self, token: str) -> tuple[dict, str]:
+        """Consume a refresh token and return its claims together with its replacement."""
+        digest = self._digest(token)
+        consumed, data = await self.redis_service.eval_script(
+            CONSUME_SCRIPT, [self._token_key(digest), self._used_key(digest)], self.ttl
+        )
+        record = refresh_token_codec.decode(data) if data else None
+        if record is None:
+            raise self._invalid_token()
+        if not consumed:
+            await self.redis_service.delete(self._family_key(record.family))
+            raise self._invalid_token()
+        return record.claims, await self.issue(record.claims, family=record.family)
+
+    async def revoke(self, token: str) -> None:
+        data = await self.redis_service.pop_value(self._token_key(self._digest(token)))
+        record = refresh_token_codec.decode(data) if data is not None else None
+        if record is not None:
+            await self.redis_service.delete(self._family_key(record.family))
+
+    @staticmethod
+    def _invalid_token() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": "Unauthorized", "error_description": "Invalid refresh token"},
+        )
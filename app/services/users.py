@@ -0,0 +1,54 @@
+from collections.abc import Awaitable, Callable
+
+from fastapi_oauth2.middleware import User as AuthUser
+
+from app.core.db import DbConnection
+from app.daos.user import UserDao
+from app.models.user import User
+
+# claim holding the local user id; only tokens issued by this service carry it, provider payloads have their own "id"
+LOCAL_ID_CLAIM = "uid"
+
+
+class UserResolver:
+    """Request-scoped identity map: each user is loaded at most once per request, whatever the lookup key."""
+
+    def __init__(self, db_connection: DbConnection) -> None:
+        self.user_dao = UserDao(db_connection=db_connection)
+        self._users: dict[tuple[str, int | str], User | None] = {}
+
+    def remember(self, user: User) -> None:
+        for key in (("id", user.id), ("email", user.email), ("identity", user.identity)):
+            self._users[key] = user
+
+    async def _get(self, key: tuple[str, int | str], load: Callable[[], Awaitable[User | None]]) -> User | None:
+        if key in self._users:
+            return self._users[key]
+        user = await load()
+        if user:
+            self.remember(user)
+        else:
+            self._users[key] = None
+        return user
+
+    async def get_by_id(self, user_id: int) -> User | None:
+        return await self._get(("id", user_id), lambda: self.user_dao.get_by_id(user_id))
+
+    async def get_by_email(self, email: str) -> User | None:
+        return await self._get(("email", email), lambda: self.user_dao.get_by_email(email))
+
+    async def get_by_identity(self, identity: str) -> User | None:
+        return await self._get(("identity", identity), lambda: self.user_dao.get_by_identity(identity))
+
+    async def get_current(self, user: AuthUser) -> User | None:
+        """The user behind the request's token: by the local id claim when present, else by identity or email.
+
+        The ``id`` claim is never used, provider tokens carry the provider's own user id there.
+        """
+        if not user.is_authenticated:
+            return None
+        if user_id := user.get(LOCAL_ID_CLAIM):
+            return await self.get_by_id(user_id)
+        if user.get("identity") and (_user := await self.get_by_identity(user["identity"])):
+            return _user
+        return await self.get_by_email(user.get("email"))
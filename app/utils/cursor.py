@@ -0,0 +1,25 @@
+import base64
+from datetime import datetime, timezone
+
+import orjson
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    """Opaque keyset cursor pointing right after the row with this ``(created_at, id)``."""
+    return base64.urlsafe_b64encode(orjson.dumps([created_at.isoformat(), id])).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ``ValueError`` for a cursor that was not made by ``encode_cursor``.
+
+    A time zone aware ``created_at`` is converted to naive UTC, the way the column stores it.
+    """
+    try:
+        created_at, id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.fromisoformat(created_at)
+        if created_at.tzinfo is not None:
+            # created_at is stored without a time zone, in UTC, and can't be compared with an aware datetime
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        return created_at, int(id)
+    except (TypeError, ValueError, orjson.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+class BoundedExecutor:
+    """Thread pool for blocking work that rejects new jobs instead of queueing them without limit.
+
+    At most ``max_workers`` jobs run at once and at most ``queue_size`` more wait for a free worker;
+    anything beyond that raises ``ExecutorSaturated`` right away.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int, thread_name_prefix: str = "") -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self.max_workers = max_workers
+        self.capacity = max_workers + queue_size
+        self.pending = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            if self.pending >= self.capacity:
+                self.rejected += 1
+                raise ExecutorSaturated
+            self.pending += 1
+        # the slot is released when the job finishes, even if the awaiting request was cancelled
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, _: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
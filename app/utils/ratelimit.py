@@ -0,0 +1,29 @@
+import time
+from collections import OrderedDict
+
+
+class TokenBuckets:
+    """Per-worker token buckets, one per key, bounded to the ``maxsize`` most recently used keys.
+
+    A worker only sees part of a client's traffic, so a bucket running dry here means the client is over
+    its limit everywhere and can be rejected without asking Redis.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, limit: int, period: float) -> float:
+        """Take a token; returns 0 on success or the seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (limit, now))
+        tokens = min(limit, tokens + (now - updated) * limit / period)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) * period / limit
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
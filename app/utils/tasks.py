@@ -0,0 +1,12 @@
+import asyncio
+from collections.abc import Coroutine
+
+# the event loop only keeps weak references to tasks
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coroutine: Coroutine) -> asyncio.Task:
+    task = asyncio.create_task(coroutine)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
@@ -0,0 +1,103 @@
+"""Run the benchmark suites, save the results as JSON and compare them with an earlier run.
+
+Suites: codecs, jwt_decode, dao_statements and password_hashing run without any service; http_load needs
+the Postgres and Redis from the settings and only runs when asked for with --suite.
+
+Usage: python -m benchmarks [--suite NAME ...] [--output FILE] [--compare BASELINE] [--tolerance 10]
+
+Results go to benchmarks/results/<commit>.json by default. With --compare every metric is printed next to
+the baseline and the exit status is 1 when one got worse by more than --tolerance percent.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks import codecs, dao_statements, http_load, jwt_decode, password_hashing
+
+SUITES = {
+    "codecs": lambda args: codecs.run(args.number),
+    "jwt_decode": lambda args: jwt_decode.run(args.number),
+    "dao_statements": lambda args: dao_statements.run(args.number),
+    "password_hashing": lambda args: asyncio.run(password_hashing.main(requests=16, workers=4)),
+    "http_load": lambda args: asyncio.run(http_load.run(args.requests, args.concurrency, args.referrals)),
+}
+DEFAULT_SUITES = ["codecs", "jwt_decode", "dao_statements", "password_hashing"]
+# run parameters, not measurements
+PARAMETERS = {"requests", "concurrency"}
+
+
+def _commit() -> str:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"]).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def _higher_is_better(metric: str) -> bool:
+    return metric.endswith("per_second")
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """Print every metric next to its baseline value and return the regressions."""
+    regressions = []
+    print(f"{current['commit']} vs. {baseline['commit']}")
+    for suite, rows in current["suites"].items():
+        # a row is identified by its first (descriptive) field, e.g. the scenario or codec
+        baseline_rows = {next(iter(row.values())): row for row in baseline["suites"].get(suite, [])}
+        for row in rows:
+            name = next(iter(row.values()))
+            old_row = baseline_rows.get(name)
+            if old_row is None:
+                continue
+            for metric, new in row.items():
+                old = old_row.get(metric)
+                if metric in PARAMETERS or not isinstance(new, int | float) or not isinstance(old, int | float):
+                    continue
+                change = (new - old) / old * 100 if old else 0.0
+                worse = -change if _higher_is_better(metric) else change
+                regressed = worse > tolerance or (not old and new > old and not _higher_is_better(metric))
+                line = f"  {suite} / {name} / {metric}: {old} -> {new} ({change:+.1f}%)"
+                print(line + ("  REGRESSION" if regressed else ""))
+                if regressed:
+                    regressions.append(line.strip())
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", action="append", choices=SUITES, help="suite to run, can be repeated")
+    parser.add_argument("--output", type=Path, help="where to save the results")
+    parser.add_argument("--compare", type=Path, help="results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="percent a metric may get worse")
+    parser.add_argument("--number", type=int, default=20000, help="calls per micro-benchmark run")
+    parser.add_argument("--requests", type=int, default=500, help="requests per http_load scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--referrals", type=int, default=10000, help="referred users seeded for http_load")
+    args = parser.parse_args()
+
+    results = {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "suites": {},
+    }
+    for suite in args.suite or DEFAULT_SUITES:
+        print(f"running {suite}", file=sys.stderr)
+        results["suites"][suite] = SUITES[suite](args)
+
+    output = args.output or Path(__file__).parent / "results" / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"results saved to {output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), results, args.tolerance)
+        sys.exit(1 if regressions else 0)
+    print(json.dumps(results["suites"], indent=2))
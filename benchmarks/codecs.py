@@ -0,0 +1,51 @@
+"""Payload size and encode/decode time of cached referrers: pickled ORM instance vs. versioned orjson snapshot.
+
+Usage: python -m benchmarks.codecs [--number 20000]
+"""
+import argparse
+import pickle
+import timeit
+from datetime import datetime, timedelta
+
+from app.models.referrers import Referrer
+from app.schemas.referrer import ReferrerSnapshot
+from app.services.codecs import referrer_codec
+
+
+def _referrer() -> Referrer:
+    now = datetime.now()
+    return Referrer(id=42, user_id=7, referrer_id="aB3dE5gH7j", created_at=now, until_at=now + timedelta(days=14))
+
+
+def _time(func, number: int) -> float:
+    """Best of five runs, in microseconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+def run(number: int) -> list[dict]:
+    referrer = _referrer()
+    snapshot = ReferrerSnapshot.model_validate(referrer)
+    pickled = pickle.dumps(referrer)
+    encoded = referrer_codec.encode(snapshot)
+    return [
+        {
+            "codec": "pickle (ORM instance)",
+            "size_bytes": len(pickled),
+            "encode_us": round(_time(lambda: pickle.dumps(referrer), number), 2),
+            "decode_us": round(_time(lambda: pickle.loads(pickled), number), 2),
+        },
+        {
+            "codec": "orjson (versioned snapshot)",
+            "size_bytes": len(encoded),
+            "encode_us": round(_time(lambda: referrer_codec.encode(snapshot), number), 2),
+            "decode_us": round(_time(lambda: referrer_codec.decode(encoded), number), 2),
+        },
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+    for result in run(args.number):
+        print(result)
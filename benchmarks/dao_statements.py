@@ -0,0 +1,114 @@
+"""Per-call overhead of the hot DAO lookups: statement built on every call vs. prebuilt vs. lambda statement.
+
+Measures what SQLAlchemy does before a query reaches the driver, the same way for every style: build the
+statement (when the style builds one per call), compute its cache key and look up the compiled SQL.
+``per_call_us`` runs against a warm compiled cache, as a DAO call does in a running process; the prebuilt
+statement's cache key is memoized on the module-level object, which is the saving the style buys.
+``first_call_us`` starts from a fresh statement and an empty cache, so every style also pays a compile.
+With --db it also runs the lookup against the configured database and checks that asyncpg prepared it
+once and reused it afterwards.
+
+Usage: python -m benchmarks.dao_statements [--number 20000] [--db]
+"""
+import argparse
+import asyncio
+import time
+import timeit
+from functools import partial
+
+from sqlalchemy import bindparam, lambda_stmt, select, text
+from sqlalchemy.util import LRUCache
+
+from app.core.db import AsyncSessionFactory, DbConnection, engine
+from app.daos import user as user_daos
+from app.daos.user import UserDao
+from app.models.user import User
+
+EMAIL = "someone@example.com"
+
+
+def _inline():
+    return select(User).where(User.email == EMAIL).execution_options(use_replica=True)
+
+
+def _prebuilt():
+    return user_daos._select_by_email
+
+
+def _fresh_prebuilt():
+    # what _prebuilt returns, before its cache key has been memoized
+    return select(User).where(User.email == bindparam("email"))
+
+
+def _lambda():
+    return lambda_stmt(lambda: select(User).where(User.email == EMAIL))
+
+
+# name, statement of a DAO call, a fresh statement of the same style, bound parameter names of the call
+STYLES = (
+    ("built per call", _inline, _inline, []),
+    ("prebuilt + bindparam", _prebuilt, _fresh_prebuilt, ["email"]),
+    ("lambda_stmt", _lambda, _lambda, []),
+)
+
+
+def _prepare(build, column_keys: list[str], compiled_cache: LRUCache | None) -> None:
+    """Build the statement, compute its cache key and fetch (or compile) its SQL, as Connection.execute does."""
+    cache = LRUCache(16) if compiled_cache is None else compiled_cache
+    build()._compile_w_cache(engine.dialect, compiled_cache=cache, column_keys=column_keys)
+
+
+def _time(func, number: int) -> float:
+    """Best of five runs, in microseconds per call."""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1_000_000
+
+
+def run(number: int) -> list[dict]:
+    results = []
+    for name, build, build_fresh, column_keys in STYLES:
+        warm_cache = LRUCache(16)
+        _prepare(build, column_keys, warm_cache)
+        results.append(
+            {
+                "statement": name,
+                "per_call_us": round(_time(partial(_prepare, build, column_keys, warm_cache), number), 2),
+                "first_call_us": round(
+                    _time(partial(_prepare, build_fresh, column_keys, None), max(number // 10, 1)), 2
+                ),
+            }
+        )
+    return results
+
+
+async def run_db(number: int) -> dict:
+    """Time get_by_email on one connection and count the server-side prepared statements it left."""
+    async with AsyncSessionFactory() as session:
+        user_dao = UserDao(db_connection=DbConnection(session=session))
+        # keep every query on one connection, the cache is per connection
+        session.info["pin_primary"] = True
+        await user_dao.get_by_email(EMAIL)
+        started = time.perf_counter()
+        for i in range(number):
+            await user_dao.get_by_email(f"{i}-{EMAIL}")
+        elapsed = time.perf_counter() - started
+        prepared = await session.scalar(
+            text("SELECT count(*) FROM pg_prepared_statements WHERE statement LIKE '%users.email = $1%'")
+        )
+    await engine.dispose()
+    return {
+        "statement": "get_by_email on the database",
+        "latency_us": round(elapsed / number * 1_000_000, 2),
+        # 1 means the statement was prepared once and reused by every call
+        "prepared_statements": prepared,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--db", action="store_true", help="also run against the configured database")
+    args = parser.parse_args()
+    for result in run(args.number):
+        print(result)
+    if args.db:
+        print(asyncio.run(run_db(min(args.number, 2000))))
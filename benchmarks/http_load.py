@@ -0,0 +1,194 @@
+"""Throughput and p50/p99 latency of the auth hot paths under concurrent load.
+
+Scenarios: an admin-only GET authenticated by the JWT cookie, /auth/login, /auth/register with and without a
+referrer and a deep /referrer/get_referrals page. Requests go to the app in-process through httpx's ASGI
+transport, or to a running server with --url (start it with RATE_LIMIT_ENABLED=false). The benchmark user is
+created on every run, so a running server can't list it in ADMIN_USER_IDS and the admin-only GET is skipped
+with --url.
+
+Needs the Postgres and Redis from the settings, e.g. `make up`; SQLite can't stand in since the DAOs use
+PostgreSQL statements. Run it from the project root. Benchmark users are created under @bench.example.com and
+deleted afterwards.
+
+Usage: python -m benchmarks.http_load [--requests 500] [--concurrency 16] [--referrals 10000] [--url URL]
+"""
+import argparse
+import asyncio
+import itertools
+import secrets
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+
+import httpx
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.db import AsyncSessionFactory, DbConnection, engine, replicas
+from app.daos.referrer import ReferrerDao
+from app.daos.user import UserDao
+from app.schemas.user import UserIn
+from app.services.hashers import get_password_hashers
+
+DOMAIN = "bench.example.com"
+PASSWORD = "correct horse battery staple"
+OWNER = f"owner@{DOMAIN}"
+API = settings.BASE_PATH_PREFIX
+
+
+async def seed(referrals: int) -> tuple[int, str]:
+    """Create the benchmark user, its referrer and ``referrals`` referred users.
+
+    Returns the user's id and the referrer id.
+    """
+    await cleanup()
+    referrer_id = f"bench{secrets.token_hex(3)}"
+    async with AsyncSessionFactory() as session:
+        db = DbConnection(session=session)
+        user_dao = UserDao(db_connection=db)
+        owner = await user_dao.create(
+            UserIn(
+                email=OWNER,
+                name="bench",
+                identity=f"{DOMAIN}:owner",
+                password=get_password_hashers().hash(PASSWORD),
+            )
+        )
+        until_at = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+        await ReferrerDao(db_connection=db).create_for_user(owner.id, referrer_id, until_at)
+        for start in range(0, referrals, settings.IMPORT_BATCH_SIZE):
+            await user_dao.bulk_create(
+                [
+                    {
+                        "email": f"ref-{i}@{DOMAIN}",
+                        "name": "bench",
+                        "identity": f"{DOMAIN}:ref-{i}",
+                        "referral_id": referrer_id,
+                    }
+                    for i in range(start, min(start + settings.IMPORT_BATCH_SIZE, referrals))
+                ]
+            )
+    return owner.id, referrer_id
+
+
+async def cleanup() -> None:
+    async with AsyncSessionFactory() as session:
+        await session.execute(
+            text("DELETE FROM referrers WHERE user_id IN (SELECT id FROM users WHERE email LIKE :pattern)"),
+            {"pattern": f"%@{DOMAIN}"},
+        )
+        await session.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": f"%@{DOMAIN}"})
+        await session.commit()
+
+
+async def load(send, requests: int, concurrency: int, warmup: int) -> dict:
+    """Run ``send(i)`` ``requests`` times from ``concurrency`` workers after ``warmup`` unrecorded calls."""
+    indexes = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker(count: int, record: bool) -> None:
+        nonlocal errors
+        while next(counter) < count:
+            started = time.perf_counter()
+            response = await send(next(indexes))
+            if record:
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code >= 400
+
+    counter = itertools.count()
+    await asyncio.gather(*(worker(warmup, False) for _ in range(concurrency)))
+    counter = itertools.count()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(requests, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+    }
+
+
+async def run(requests: int, concurrency: int, referrals: int, url: str | None = None) -> list[dict]:
+    if url:
+        transport, lifespan = None, None
+    else:
+        # imported here, the app module mounts ./static and builds the container on import
+        from app.__main__ import app
+
+        settings.RATE_LIMIT_ENABLED = False
+        transport, lifespan = httpx.ASGITransport(app=app), app.router.lifespan_context(app)
+    owner_id, referrer_id = await seed(referrals)
+    if not url:
+        settings.ADMIN_USER_IDS = [*settings.ADMIN_USER_IDS, owner_id]
+    results = []
+    try:
+        if lifespan:
+            await lifespan.__aenter__()
+        # cookies set by login/register are not sent back, every request carries exactly what the scenario sets
+        cookies = CookieJar(policy=DefaultCookiePolicy(allowed_domains=[]))
+        async with httpx.AsyncClient(
+            transport=transport, base_url=url or "http://bench", cookies=cookies, timeout=60
+        ) as client:
+            login = {"email": OWNER, "password": PASSWORD}
+            response = await client.post(f"{API}/auth/login", data=login)
+            cookie = response.cookies.get("Authorization")
+            if not cookie:
+                raise RuntimeError(f"login failed with {response.status_code}: {response.text}")
+            run_id = secrets.token_hex(3)
+
+            def register(referral_id: str | None):
+                def send(i: int):
+                    email = f"reg-{run_id}-{referral_id is not None:d}-{i}@{DOMAIN}"
+                    return client.post(
+                        f"{API}/auth/register",
+                        json={
+                            "email": email,
+                            "name": "bench",
+                            "identity": f"{DOMAIN}:{email}",
+                            "password": PASSWORD,
+                            "referral_id": referral_id,
+                        },
+                    )
+
+                return send
+
+            scenarios = {}
+            if not url:
+                # require_admin reads the user the JWT cookie authenticates, the handler itself is trivial
+                scenarios["GET /stats/auth_caches (cookie JWT)"] = lambda i: client.get(
+                    f"{API}/stats/auth_caches", headers={"Cookie": f"Authorization={cookie}"}
+                )
+            scenarios |= {
+                "POST /auth/login": lambda i: client.post(f"{API}/auth/login", data=login),
+                "POST /auth/register": register(None),
+                "POST /auth/register with referrer": register(referrer_id),
+                "GET /referrer/get_referrals deep page": lambda i: client.get(
+                    f"{API}/referrer/get_referrals",
+                    params={"referrer_id": referrer_id, "limit": 100, "offset": max(0, referrals - 100)},
+                ),
+            }
+            for name, send in scenarios.items():
+                results.append({"scenario": name, **await load(send, requests, concurrency, warmup=concurrency)})
+    finally:
+        if lifespan:
+            await lifespan.__aexit__(None, None, None)
+        await cleanup()
+        await engine.dispose()
+        await replicas.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--referrals", type=int, default=10000)
+    parser.add_argument("--url", help="benchmark a running server instead of the app in-process")
+    args = parser.parse_args()
+    for result in asyncio.run(run(args.requests, args.concurrency, args.referrals, args.url)):
+        print(result)
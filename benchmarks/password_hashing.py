@@ -0,0 +1,74 @@
+"""Event-loop scheduling delay while hashing passwords inline vs. on the bounded worker pool.
+
+The delay is how late a 1 ms timer fires on the loop doing the hashing, i.e. how long every other request on
+that worker would be held up; it is not a request latency and can't be compared with the http_load p99_ms.
+
+Usage: python -m benchmarks.password_hashing [--requests 16] [--workers 4]
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.hashers import BcryptHasher, PasswordHashers
+from app.services.security import SecurityService
+from app.utils.executor import BoundedExecutor
+
+TICK = 0.001
+
+
+async def _measure_lag(stop: asyncio.Event) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+    return lags
+
+
+async def _inline(hashers: PasswordHashers, password: str, hashed: str) -> None:
+    hashers.verify(password, hashed)
+
+
+async def _pooled(service: SecurityService, password: str, hashed: str) -> None:
+    await service.verify_password(password, hashed)
+
+
+async def run(mode: str, requests: int, workers: int) -> dict:
+    password = "correct horse battery staple"
+    hashers = PasswordHashers(BcryptHasher())
+    hashed = hashers.hash(password)
+    executor = BoundedExecutor(max_workers=workers, queue_size=requests)
+    service = SecurityService(executor, hashers)
+
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_measure_lag(stop))
+    await asyncio.sleep(TICK * 10)
+    started = time.perf_counter()
+    if mode == "inline":
+        await asyncio.gather(*(_inline(hashers, password, hashed) for _ in range(requests)))
+    else:
+        await asyncio.gather(*(_pooled(service, password, hashed) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    lags = sorted(await ticker)
+    executor.shutdown()
+    return {
+        "mode": mode,
+        "requests": requests,
+        "elapsed_s": round(elapsed, 3),
+        "loop_delay_max_ms": round(lags[-1] * 1000, 2),
+        "loop_delay_p99_ms": round(lags[int(len(lags) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(requests: int, workers: int) -> list[dict]:
+    return [await run(mode, requests, workers) for mode in ("inline", "pooled")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    for result in asyncio.run(main(args.requests, args.workers)):
+        print(result)
@@ -0,0 +1,12 @@
+import os
+
+# app.core.config reads these on import
+os.environ.setdefault("PROJECT_NAME", "test")
+os.environ.setdefault("POSTGRES_HOST", "localhost")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("REDIS_HOST", "localhost")
+os.environ.setdefault("OAUTH2_GITHUB_CLIENT_ID", "github-client")
+os.environ.setdefault("OAUTH2_GITHUB_CLIENT_SECRET", "github-secret")
+os.environ.setdefault("OAUTH2_GOOGLE_CLIENT_ID", "google-client")
+os.environ.setdefault("OAUTH2_GOOGLE_CLIENT_SECRET", "google-secret")
@@ -0,0 +1,150 @@
+from fastapi import FastAPI, HTTPException, Request, status
+
+from collections.abc import AsyncIterable, AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import fakeredis
+import httpx
+import pytest
+from dishka import Provider, Scope, make_async_container, provide
+from dishka.integrations.fastapi import setup_dishka
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.routers import api_router
+from app.services import AuthService, RedisService, ratelimit
+from app.services.ratelimit import RateLimiter
+from app.services.revocation import TokenRevocationList
+from app.services.security import OAuth2Middleware, known_identities, verified_tokens
+from app.services.tokens import RefreshTokenService
+from app.utils.ratelimit import TokenBuckets
+
+API = settings.BASE_PATH_PREFIX
+
+
+class FakeAuthService:
+    """Stands in for AuthService, which needs PostgreSQL, with the users kept in memory."""
+
+    def __init__(self) -> None:
+        self.users: dict[str, SimpleNamespace] = {}
+
+    def add_user(self, email: str, password: str | None = None, identity: str | None = None) -> SimpleNamespace:
+        user = SimpleNamespace(
+            id=len(self.users) + 1, email=email, name=email, identity=identity or email, password=password
+        )
+        self.users[user.identity] = user
+        return user
+
+    async def provision_user(self, email: str, name: str, identity: str) -> SimpleNamespace:
+        return self.users.get(identity) or self.add_user(email, identity=identity)
+
+    async def register_user(self, user_data) -> SimpleNamespace:
+        if any(user.email == user_data.email for user in self.users.values()):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"error": "Bad Request", "error_description": "User already exists"},
+            )
+        return self.add_user(user_data.email, password=user_data.password, identity=user_data.identity)
+
+    async def login(self, email: str, password: str) -> SimpleNamespace:
+        for user in self.users.values():
+            if user.email == email and user.password == password:
+                return user
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={"error": "Unauthorized", "error_description": "Incorrect email or password"},
+        )
+
+
+class FakeAdaptersProvider(Provider):
+    scope = Scope.REQUEST
+
+    def __init__(self, redis: Redis, auth_service: FakeAuthService) -> None:
+        super().__init__()
+        self._redis = redis
+        self._auth_service = auth_service
+
+    @provide(scope=Scope.APP)
+    def redis(self) -> Redis:
+        return self._redis
+
+    @provide(scope=Scope.APP)
+    async def token_revocations(self, redis: Redis) -> AsyncIterable[TokenRevocationList]:
+        revocations = TokenRevocationList(redis)
+        await revocations.start()
+        yield revocations
+        await revocations.stop()
+
+    @provide
+    def auth_service(self) -> AuthService:
+        return self._auth_service
+
+    redis_service = provide(RedisService)
+    refresh_tokens = provide(RefreshTokenService)
+    rate_limiter = provide(RateLimiter)
+
+
+def build_app(redis: Redis, auth_service: FakeAuthService, callback: Callable | None = None) -> FastAPI:
+    """The API routers behind the real authentication middleware, with Redis faked and no database."""
+    app = FastAPI()
+    app.include_router(api_router, prefix=API)
+
+    @app.get("/whoami")
+    async def whoami(request: Request) -> dict:
+        return dict(request.user)
+
+    config = settings.oauth2_config
+    # tokens are issued as cookies only in SSR mode
+    config.enable_ssr = True
+    app.add_middleware(OAuth2Middleware, config=config, callback=callback)
+    setup_dishka(make_async_container(FakeAdaptersProvider(redis, auth_service)), app)
+    return app
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_caches(monkeypatch) -> None:
+    verified_tokens.clear()
+    known_identities.clear()
+    monkeypatch.setattr(ratelimit, "local_buckets", TokenBuckets(settings.RATE_LIMIT_LOCAL_KEYS))
+
+
+@pytest.fixture
+def redis_server() -> fakeredis.FakeServer:
+    """Set ``connected = False`` on it to make every command fail with a ConnectionError."""
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis(redis_server: fakeredis.FakeServer) -> Redis:
+    return fakeredis.FakeAsyncRedis(server=redis_server)
+
+
+@pytest.fixture
+def auth_service() -> FakeAuthService:
+    return FakeAuthService()
+
+
+@pytest.fixture
+def make_client(redis: Redis, auth_service: FakeAuthService):
+    """``make_client(callback=None)``: an async context manager yielding a client of a fresh app."""
+
+    @asynccontextmanager
+    async def make(callback: Callable | None = None) -> AsyncIterator[httpx.AsyncClient]:
+        app = build_app(redis, auth_service, callback)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+            yield client
+        await app.state.dishka_container.close()
+
+    return make
+
+
+@pytest.fixture
+async def client(make_client) -> AsyncIterator[httpx.AsyncClient]:
+    async with make_client() as client:
+        yield client
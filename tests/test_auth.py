@@ -0,0 +1,124 @@
+from fastapi import HTTPException
+
+import asyncio
+
+import pytest
+
+from app.routers.auth import REFRESH_COOKIE
+from app.services import RedisService
+from app.services.tokens import RefreshTokenService
+from app.services.users import LOCAL_ID_CLAIM
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+EMAIL = "someone@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def user(auth_service):
+    return auth_service.add_user(EMAIL, password=PASSWORD)
+
+
+async def login(client) -> tuple[str, str]:
+    """Log in and return the access token cookie and the refresh token."""
+    response = await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": PASSWORD})
+    assert response.status_code == 307
+    return response.cookies["Authorization"], response.cookies[REFRESH_COOKIE]
+
+
+@pytest.mark.parametrize("path", ["/auth/logout", "/oauth2/logout"])
+async def test_logout_revokes_the_refresh_token_family(client, user, path):
+    access_token, refresh_token = await login(client)
+
+    await client.get(f"{API}{path}", follow_redirects=True)
+
+    assert REFRESH_COOKIE not in client.cookies
+    assert "Authorization" not in client.cookies
+    response = await client.post(f"{API}/auth/refresh", data={"refresh_token": refresh_token})
+    assert response.status_code == 401
+    response = await client.get("/whoami", headers={"Cookie": f"Authorization={access_token}"})
+    assert response.status_code == 400
+    assert response.text == "Token revoked"
+
+
+async def refresh(client, refresh_token: str):
+    return await client.post(f"{API}/auth/refresh", data={"refresh_token": refresh_token})
+
+
+async def test_refresh_rotates_the_token(client, user):
+    _, refresh_token = await login(client)
+
+    response = await refresh(client, refresh_token)
+
+    assert response.status_code == 200
+    tokens = response.json()
+    assert tokens["refresh_token"] != refresh_token
+    assert client.cookies[REFRESH_COOKIE] == tokens["refresh_token"]
+    assert client.cookies["Authorization"].strip('"') == f"Bearer {tokens['access_token']}"
+    response = await client.get("/whoami")
+    assert response.json()[LOCAL_ID_CLAIM] == user.id
+    # the old token was consumed
+    assert (await refresh(client, refresh_token)).status_code == 401
+
+
+async def test_refresh_reads_the_cookie(client, user):
+    await login(client)
+
+    response = await client.post(f"{API}/auth/refresh")
+
+    assert response.status_code == 200
+    assert client.cookies[REFRESH_COOKIE] == response.json()["refresh_token"]
+
+
+async def test_reused_token_revokes_the_family(client, user):
+    _, stolen = await login(client)
+    rotated = (await refresh(client, stolen)).json()["refresh_token"]
+
+    response = await refresh(client, stolen)
+
+    assert response.status_code == 401
+    assert response.json()["detail"]["error_description"] == "Invalid refresh token"
+    # the legitimate holder has to log in again too
+    assert (await refresh(client, rotated)).status_code == 401
+
+
+async def test_reuse_does_not_revoke_other_families(client, user):
+    _, first = await login(client)
+    _, second = await login(client)
+    await refresh(client, first)
+
+    await refresh(client, first)
+
+    assert (await refresh(client, second)).status_code == 200
+
+
+@pytest.mark.parametrize("refresh_token", [None, "unknown"])
+async def test_refresh_without_a_valid_token(client, refresh_token):
+    response = await client.post(f"{API}/auth/refresh", data={"refresh_token": refresh_token} if refresh_token else {})
+
+    assert response.status_code == 401
+
+
+class SlowRedisService(RedisService):
+    """Yields to other requests between commands, the way a round trip to a real Redis does."""
+
+    async def set_value(self, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return await super().set_value(*args, **kwargs)
+
+
+async def test_concurrent_reuse_revokes_the_family(redis):
+    refresh_tokens = RefreshTokenService(SlowRedisService(redis))
+    token = await refresh_tokens.issue({LOCAL_ID_CLAIM: 1})
+
+    results = await asyncio.gather(refresh_tokens.rotate(token), refresh_tokens.rotate(token), return_exceptions=True)
+
+    assert any(isinstance(result, HTTPException) for result in results)
+    # the family is gone, so whichever request won holds a dead token too
+    assert not await redis.keys("refresh_family:*")
+    for result in results:
+        if not isinstance(result, Exception):
+            with pytest.raises(HTTPException):
+                await refresh_tokens.rotate(result[1])
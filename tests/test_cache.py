@@ -0,0 +1,165 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.db import DbConnection
+from app.daos.referrer import ReferrerDao
+from app.schemas.referrer import ReferrerSnapshot
+from app.services import RedisService
+from app.services.cache import MISSING, ReadThroughCache, SingleFlight
+from app.services.codecs import referrer_codec
+from app.services.referrer import ReferrerService
+
+pytestmark = pytest.mark.anyio
+
+REFERRER = SimpleNamespace(
+    id=1, user_id=7, referrer_id="abc", created_at=datetime(2024, 1, 1), until_at=datetime.now() + timedelta(days=1)
+)
+SNAPSHOT = ReferrerSnapshot.model_validate(REFERRER)
+
+
+class Loader:
+    """A slow loader counting its calls."""
+
+    def __init__(self, value: ReferrerSnapshot | None) -> None:
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self) -> ReferrerSnapshot | None:
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return self.value
+
+
+@pytest.fixture
+def cache(redis) -> ReadThroughCache:
+    return ReadThroughCache(RedisService(redis), SingleFlight())
+
+
+async def test_miss_loads_and_stores_the_value(cache, redis):
+    loader = Loader(SNAPSHOT)
+
+    assert await cache.get_or_load("key", loader, codec=referrer_codec) == SNAPSHOT
+    assert await cache.get_or_load("key", loader, codec=referrer_codec) == SNAPSHOT
+
+    assert loader.calls == 1
+    assert referrer_codec.decode(await redis.get("key")) == SNAPSHOT
+    assert not await redis.exists("lock:key")
+
+
+async def test_missing_value_is_cached_negatively(cache, redis):
+    loader = Loader(None)
+
+    assert await cache.get_or_load("key", loader, codec=referrer_codec) is None
+    assert await cache.get_or_load("key", loader, codec=referrer_codec) is None
+
+    assert loader.calls == 1
+    assert await redis.get("key") == MISSING
+
+
+@pytest.mark.parametrize(
+    "value",
+    [b"ReferrerSnapshot:v0:{}", b'ReferrerSnapshot:v1:{"id": 1, "user_', b'ReferrerSnapshot:v1:{"id": "x"}'],
+    ids=["other version", "truncated", "invalid"],
+)
+async def test_undecodable_value_is_a_miss(cache, redis, value):
+    await redis.set("key", value)
+    loader = Loader(SNAPSHOT)
+
+    assert await cache.get_or_load("key", loader, codec=referrer_codec) == SNAPSHOT
+    assert loader.calls == 1
+
+
+async def test_concurrent_misses_load_once(cache):
+    loader = Loader(SNAPSHOT)
+
+    results = await asyncio.gather(*(cache.get_or_load("key", loader, codec=referrer_codec) for _ in range(10)))
+
+    assert results == [SNAPSHOT] * 10
+    assert loader.calls == 1
+
+
+async def test_cancelled_caller_does_not_cancel_the_shared_load(cache):
+    loader = Loader(SNAPSHOT)
+    first = asyncio.ensure_future(cache.get_or_load("key", loader, codec=referrer_codec))
+    await asyncio.sleep(0.01)
+    second = asyncio.ensure_future(cache.get_or_load("key", loader, codec=referrer_codec))
+    await asyncio.sleep(0.01)
+
+    first.cancel()
+
+    assert await second == SNAPSHOT
+    assert loader.calls == 1
+
+
+async def test_other_worker_waits_for_the_lock_holder(redis):
+    # each worker has its own SingleFlight, only the Redis lock is shared
+    workers = [ReadThroughCache(RedisService(redis), SingleFlight()) for _ in range(2)]
+    loaders = [Loader(SNAPSHOT), Loader(SNAPSHOT)]
+
+    results = await asyncio.gather(
+        *(worker.get_or_load("key", loader, codec=referrer_codec) for worker, loader in zip(workers, loaders))
+    )
+
+    assert results == [SNAPSHOT, SNAPSHOT]
+    assert sum(loader.calls for loader in loaders) == 1
+
+
+async def test_invalidate_drops_the_value(cache):
+    loader = Loader(SNAPSHOT)
+    await cache.get_or_load("key", loader, codec=referrer_codec)
+
+    await cache.invalidate("key")
+    await cache.get_or_load("key", loader, codec=referrer_codec)
+
+    assert loader.calls == 2
+
+
+@pytest.fixture
+def referrer_loads(monkeypatch) -> list[DbConnection]:
+    """The connections ReferrerDao.get_by_referrer_id ran on, one per call."""
+    loads = []
+
+    async def get_by_referrer_id(self, referrer_id: str):
+        loads.append(self.db_connection)
+        await asyncio.sleep(0.05)
+        return REFERRER if referrer_id == REFERRER.referrer_id else None
+
+    monkeypatch.setattr(ReferrerDao, "get_by_referrer_id", get_by_referrer_id)
+    return loads
+
+
+@pytest.fixture
+def closed(monkeypatch) -> list[DbConnection]:
+    closed = []
+
+    async def close(self):
+        closed.append(self)
+
+    monkeypatch.setattr(DbConnection, "close", close)
+    return closed
+
+
+async def test_concurrent_requests_share_a_load_on_its_own_connection(redis, referrer_loads, closed):
+    single_flight = SingleFlight()
+    # one service per request, as the request-scoped container builds them
+    services = [ReferrerService(ReadThroughCache(RedisService(redis), single_flight)) for _ in range(2)]
+
+    results = await asyncio.gather(*(service.get_by_referrer_id("abc") for service in services))
+
+    assert [result.user_id for result in results] == [7, 7]
+    assert len(referrer_loads) == 1
+    assert closed == referrer_loads
+
+
+async def test_slow_loader_leaves_a_lock_taken_over_by_another_worker(cache, redis):
+    async def slow_loader():
+        # the lock expires meanwhile and another worker takes it
+        await redis.delete("lock:key")
+        await redis.set("lock:key", "other worker", ex=5)
+        return SNAPSHOT
+
+    assert await cache.get_or_load("key", slow_loader, codec=referrer_codec) == SNAPSHOT
+    assert await redis.get("lock:key") == b"other worker"
@@ -0,0 +1,39 @@
+import base64
+from datetime import datetime, timedelta, timezone
+
+import orjson
+import pytest
+
+from app.utils.cursor import decode_cursor, encode_cursor
+
+
+def make_cursor(created_at: str, id) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([created_at, id])).decode()
+
+
+def test_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+@pytest.mark.parametrize(
+    "created_at",
+    [
+        datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+        datetime(2024, 5, 1, 15, 30, tzinfo=timezone(timedelta(hours=3))),
+    ],
+)
+def test_aware_datetime_becomes_naive_utc(created_at):
+    decoded, _ = decode_cursor(encode_cursor(created_at, 42))
+
+    assert decoded == datetime(2024, 5, 1, 12, 30)
+    assert decoded.tzinfo is None
+
+
+@pytest.mark.parametrize(
+    "cursor", ["not base64!", make_cursor("yesterday", 1), make_cursor("2024-05-01T12:30:00", "x"), make_cursor(1, 1)]
+)
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.daos import user as user_daos
+
+
+@pytest.mark.parametrize("statement", [user_daos._select_by_email, user_daos._select_by_identity])
+def test_auth_lookups_stay_on_the_primary(statement):
+    assert not statement.get_execution_options().get("use_replica")
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        rows = len(statement.compile(dialect=postgresql.dialect()).params) // len(statement.table.c)
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: [None] * rows))
+
+
+async def commit() -> None:
+    pass
+
+
+@pytest.mark.anyio
+async def test_bulk_create_stays_under_the_bind_parameter_limit():
+    session = FakeSession()
+    user_dao = user_daos.UserDao(db_connection=SimpleNamespace(session=session, commit=commit))
+    row = {column: None for column in user_dao.columns}
+    rows_per_statement = user_daos.MAX_BIND_PARAMS // len(row)
+
+    inserted = await user_dao.bulk_create([row] * (2 * rows_per_statement + 1))
+
+    assert inserted == 2 * rows_per_statement + 1
+    assert len(session.statements) == 3
+    for statement in session.statements:
+        assert len(statement.compile(dialect=postgresql.dialect()).params) <= user_daos.MAX_BIND_PARAMS
@@ -0,0 +1,55 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.db import InstrumentedQueuePool, PoolMetrics
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeDbapiConnection:
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, {"pool": "test", **labels}) or 0.0
+
+
+@pytest.fixture
+def pool() -> InstrumentedQueuePool:
+    pool = InstrumentedQueuePool(FakeDbapiConnection, pool_size=1, max_overflow=0, timeout=0.05)
+    pool.metrics = PoolMetrics("test")
+    return pool
+
+
+async def test_exhausted_pool_reaches_prometheus(pool):
+    waits = sample("db_pool_events_total", event="wait")
+    timeouts = sample("db_pool_events_total", event="timeout")
+    observed = sample("db_pool_checkout_wait_seconds_count")
+    connection = await greenlet_spawn(pool.connect)
+
+    with pytest.raises(exc.TimeoutError):
+        await greenlet_spawn(pool.connect)
+
+    assert sample("db_pool_events_total", event="wait") == waits + 1
+    assert sample("db_pool_events_total", event="timeout") == timeouts + 1
+    assert sample("db_pool_checkout_wait_seconds_count") == observed + 1
+    assert pool.stats().timeouts == 1
+    await greenlet_spawn(connection.close)
+
+
+def test_checked_out_gauge():
+    metrics = PoolMetrics("test")
+    checked_out = sample("db_pool_checked_out_connections")
+
+    metrics.checked_out()
+    metrics.checked_out()
+    metrics.checked_in()
+
+    assert sample("db_pool_checked_out_connections") == checked_out + 1
+    assert metrics.checkouts == 2
@@ -0,0 +1,84 @@
+from fastapi import HTTPException
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.hashers import BcryptHasher, PasswordHashers
+from app.services.security import SecurityService
+from app.utils.executor import BoundedExecutor, ExecutorSaturated
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor(max_workers=1, queue_size=1)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def release():
+    """Set it to let the blocked jobs finish."""
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+async def fill(executor: BoundedExecutor, release: threading.Event) -> list[asyncio.Task]:
+    jobs = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(executor.capacity)]
+    await asyncio.sleep(0.01)
+    return jobs
+
+
+def fail() -> None:
+    raise ValueError("boom")
+
+
+async def test_rejects_beyond_workers_and_queue(executor, release):
+    jobs = await fill(executor, release)
+
+    with pytest.raises(ExecutorSaturated):
+        await executor.run(sum, [1, 2])
+    assert executor.rejected == 1
+
+    release.set()
+    await asyncio.gather(*jobs)
+    assert executor.pending == 0
+
+
+async def test_slots_are_released_after_success_and_failure(executor):
+    assert await executor.run(sum, [1, 2]) == 3
+    with pytest.raises(ValueError):
+        await executor.run(fail)
+
+    assert executor.pending == 0
+    assert await asyncio.gather(*(executor.run(sum, [i]) for i in range(executor.capacity))) == [0, 1]
+
+
+async def test_slot_is_released_when_the_caller_gives_up(executor, release):
+    jobs = await fill(executor, release)
+    for job in jobs:
+        job.cancel()
+    assert executor.pending == executor.capacity
+
+    release.set()
+    await asyncio.sleep(0.05)
+
+    assert executor.pending == 0
+
+
+async def test_saturated_hashing_is_a_503(executor, release):
+    service = SecurityService(executor, PasswordHashers(BcryptHasher(rounds=4)))
+    jobs = await fill(executor, release)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await service.verify_password("password", "$2b$04$" + "a" * 53)
+
+    assert exc_info.value.status_code == 503
+    assert exc_info.value.headers == {"Retry-After": "1"}
+    release.set()
+    await asyncio.gather(*jobs)
+    assert await service.verify_password("password", await service.get_password_hash("password"))
@@ -0,0 +1,121 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.core.db import DbConnection
+from app.daos.user import UserDao
+from app.services import auth
+from app.services.auth import AuthService
+from app.services.hashers import Argon2idHasher, BcryptHasher, PasswordHashers, get_password_hashers
+from app.services.security import SecurityService
+from app.utils import tasks
+from app.utils.executor import BoundedExecutor
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def argon2id_config(monkeypatch) -> PasswordHashers:
+    """argon2id by default with cheap costs, bcrypt still accepted."""
+    monkeypatch.setattr(settings, "PASSWORD_HASHER", "argon2id")
+    monkeypatch.setattr(settings, "ARGON2_TIME_COST", 1)
+    monkeypatch.setattr(settings, "ARGON2_MEMORY_COST", 8)
+    monkeypatch.setattr(settings, "ARGON2_PARALLELISM", 1)
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+    return get_password_hashers()
+
+
+def test_bcrypt_hash_verifies_and_needs_an_upgrade(argon2id_config):
+    hashed = BcryptHasher(rounds=4).hash(PASSWORD)
+
+    assert argon2id_config.verify(PASSWORD, hashed)
+    assert not argon2id_config.verify("wrong password", hashed)
+    assert argon2id_config.needs_rehash(hashed)
+
+
+def test_current_hash_needs_no_upgrade(argon2id_config):
+    hashed = argon2id_config.hash(PASSWORD)
+
+    assert hashed.startswith("$argon2id$")
+    assert argon2id_config.verify(PASSWORD, hashed)
+    assert not argon2id_config.needs_rehash(hashed)
+
+
+def test_hash_with_other_costs_needs_an_upgrade(argon2id_config):
+    hashed = Argon2idHasher(time_cost=2, memory_cost=8, parallelism=1).hash(PASSWORD)
+
+    assert argon2id_config.verify(PASSWORD, hashed)
+    assert argon2id_config.needs_rehash(hashed)
+
+
+def test_bcrypt_rounds_change_needs_an_upgrade():
+    hashers = PasswordHashers(BcryptHasher(rounds=5))
+
+    assert hashers.needs_rehash(BcryptHasher(rounds=4).hash(PASSWORD))
+    assert not hashers.needs_rehash(hashers.hash(PASSWORD))
+
+
+def test_unknown_hash_does_not_verify(argon2id_config):
+    assert not argon2id_config.verify(PASSWORD, "plain text")
+
+
+@pytest.fixture
+def updated_passwords(monkeypatch) -> dict[int, str]:
+    """Passwords stored by UserDao.update_password, by user id."""
+    updated = {}
+
+    @asynccontextmanager
+    async def session_factory():
+        yield None
+
+    async def update_password(self, user_id: int, hashed_password: str) -> None:
+        updated[user_id] = hashed_password
+
+    monkeypatch.setattr(auth, "AsyncSessionFactory", session_factory)
+    monkeypatch.setattr(UserDao, "update_password", update_password)
+    return updated
+
+
+@pytest.fixture
+def login(argon2id_config):
+    executor = BoundedExecutor(max_workers=1, queue_size=4)
+
+    async def login(hashed_password: str, password: str = PASSWORD):
+        user = SimpleNamespace(id=7, email="someone@example.com", password=hashed_password)
+
+        async def get_by_email(email: str):
+            return user
+
+        auth_service = AuthService(
+            DbConnection(), None, SecurityService(executor, argon2id_config), SimpleNamespace(get_by_email=get_by_email)
+        )
+        result = await auth_service.authenticate_user(user.email, password)
+        await asyncio.gather(*tasks._background_tasks)
+        return result
+
+    yield login
+    executor.shutdown()
+
+
+async def test_login_upgrades_an_outdated_hash(login, updated_passwords, argon2id_config):
+    assert await login(BcryptHasher(rounds=4).hash(PASSWORD))
+
+    assert updated_passwords[7].startswith("$argon2id$")
+    assert argon2id_config.verify(PASSWORD, updated_passwords[7])
+
+
+async def test_login_keeps_a_current_hash(login, updated_passwords, argon2id_config):
+    assert await login(argon2id_config.hash(PASSWORD))
+
+    assert not updated_passwords
+
+
+async def test_failed_login_upgrades_nothing(login, updated_passwords):
+    assert not await login(BcryptHasher(rounds=4).hash(PASSWORD), password="wrong password")
+
+    assert not updated_passwords
@@ -0,0 +1,61 @@
+import pytest
+
+from app.schemas.imports import DataFormat
+from app.services.importer import UserImportService, iter_lines
+
+pytestmark = pytest.mark.anyio
+
+
+async def chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+
+async def records(fmt: DataFormat, *parts: bytes) -> list[tuple]:
+    return [record async for record in UserImportService._records(iter_lines(chunks(*parts)), fmt)]
+
+
+async def test_lines_split_across_chunks():
+    lines = [line async for line in iter_lines(chunks(b"first\r\nsec", b"ond\n", b"third"))]
+
+    assert lines == ["first", "second", "third"]
+
+
+async def test_csv_quoted_field_spanning_lines():
+    parsed = await records(
+        DataFormat.csv,
+        b"email,name,identity\n",
+        b'a@example.com,"Line one\n\nline ""two""",a\n',
+        b"b@example.com,B,b\n",
+    )
+
+    assert parsed == [
+        (2, {"email": "a@example.com", "name": 'Line one\n\nline "two"', "identity": "a"}, None),
+        (5, {"email": "b@example.com", "name": "B", "identity": "b"}, None),
+    ]
+
+
+async def test_csv_rejected_rows_keep_their_line_numbers():
+    parsed = await records(
+        DataFormat.csv, b'email,name,identity\n\na@example.com,A\nb@example.com,B,b,extra\nc@example.com,"C,c\n'
+    )
+
+    assert parsed == [
+        (3, None, "expected 3 columns, got 2"),
+        (4, None, "expected 3 columns, got 4"),
+        (5, None, "unterminated quoted field"),
+    ]
+
+
+async def test_csv_empty_optional_fields_are_null():
+    parsed = await records(DataFormat.csv, b"email,name,identity,password\na@example.com,A,a,\n")
+
+    assert parsed[0][1]["password"] is None
+
+
+async def test_ndjson_records():
+    parsed = await records(DataFormat.ndjson, b'{"email": "a@example.com"}\n\n[1]\n{oops\n')
+
+    assert parsed[0] == (1, {"email": "a@example.com"}, None)
+    assert parsed[1] == (3, None, "record must be a JSON object")
+    assert parsed[2][0] == 4 and parsed[2][2].startswith("invalid JSON")
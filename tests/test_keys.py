@@ -0,0 +1,205 @@
+from fastapi import FastAPI
+
+import base64
+import hashlib
+import json
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jose import JWTError, jwt
+
+from app.core.config import settings
+from app.core.keys import JWTKey, KeyRing, _thumbprint, load_key_ring
+from app.routers import well_known
+
+pytestmark = pytest.mark.anyio
+
+CLAIMS = {"uid": 1, "exp": int(time.time()) + 3600}
+
+# the example key and thumbprint of RFC 7638, section 3.1
+RFC7638_JWK = {
+    "kty": "RSA",
+    "n": "0vx7agoebGcQSuuPiLJXZptN9nndrQmbXEps2aiAFbWhM78LhWx4cbbfAAtVT86zwu1RK7aPFFxuhDR1L6tSoc_BJECPebWKRXjBZCiFV4n3o"
+    "knjhMstn64tZ_2W-5JsGY4Hc5n9yBXArwl93lqt7_RN5w6Cf0h4QyQ5v-65YGjQR0_FDW2QvzqY368QQMicAtaSqzs8KJZgnYb9c7d0zgdAZHzu6qMQv"
+    "RL5hajrn1n91CbOpbISD08qNLyrdkt-bFTWhAI4vMQFh6WeZu0fM4lFd2NcRwr3XPksINHaQ-G_xBniIqbw0Ls1jF44-csFCur-kEgU8awapJzKnqDKgw",
+    "e": "AQAB",
+    "alg": "RS256",
+    "kid": "2011-04-29",
+}
+RFC7638_THUMBPRINT = "NzbLsXh8uDCcd-6MNwXF4W_7noWXFZAfHkxZsRGC9Xs"
+
+
+def private_pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+
+
+def public_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+@pytest.fixture(scope="module")
+def rsa_keys() -> list:
+    return [rsa.generate_private_key(public_exponent=65537, key_size=2048) for _ in range(2)]
+
+
+@pytest.fixture(scope="module")
+def ec_keys() -> list:
+    return [ec.generate_private_key(ec.SECP256R1()) for _ in range(2)]
+
+
+@pytest.fixture(params=["RS256", "ES256"])
+def keys(request, rsa_keys, ec_keys) -> tuple[str, list]:
+    return request.param, rsa_keys if request.param == "RS256" else ec_keys
+
+
+def b64(number: int, length: int) -> str:
+    return base64.urlsafe_b64encode(number.to_bytes(length, "big")).rstrip(b"=").decode()
+
+
+def test_thumbprint_matches_rfc7638():
+    assert _thumbprint(RFC7638_JWK) == RFC7638_THUMBPRINT
+
+
+def test_token_signed_with_the_previous_key_still_verifies(keys):
+    algorithm, (previous, current) = keys
+    token = KeyRing(JWTKey.from_private_pem(private_pem(previous))).encode(CLAIMS)
+
+    rotated = KeyRing(JWTKey.from_private_pem(private_pem(current)), [JWTKey.from_public_pem(public_pem(previous))])
+
+    assert jwt.get_unverified_header(token)["alg"] == algorithm
+    assert rotated.decode(token)["uid"] == 1
+    assert rotated.decode(rotated.encode(CLAIMS))["uid"] == 1
+
+
+def test_token_signed_with_a_retired_key_is_rejected(keys):
+    _, (previous, current) = keys
+    token = KeyRing(JWTKey.from_private_pem(private_pem(previous))).encode(CLAIMS)
+
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        KeyRing(JWTKey.from_private_pem(private_pem(current))).decode(token)
+
+
+def test_unknown_kid_is_rejected(keys):
+    _, (_, current) = keys
+    signing_key = JWTKey.from_private_pem(private_pem(current))
+    token = jwt.encode(CLAIMS, signing_key.signing_key, algorithm=signing_key.algorithm, headers={"kid": "unknown"})
+
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        KeyRing(signing_key).decode(token)
+
+
+def test_kid_of_a_key_ring_member_does_not_vouch_for_another_signature(keys):
+    _, (previous, current) = keys
+    signing_key = JWTKey.from_private_pem(private_pem(current))
+    forged = jwt.encode(
+        CLAIMS,
+        JWTKey.from_private_pem(private_pem(previous)).signing_key,
+        algorithm=signing_key.algorithm,
+        headers={"kid": signing_key.kid},
+    )
+
+    with pytest.raises(JWTError):
+        KeyRing(signing_key).decode(forged)
+
+
+def test_asymmetric_token_without_kid_is_rejected(keys):
+    _, (_, current) = keys
+    signing_key = JWTKey.from_private_pem(private_pem(current))
+    token = jwt.encode(CLAIMS, signing_key.signing_key, algorithm=signing_key.algorithm)
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        KeyRing(signing_key).decode(token)
+
+
+def test_shared_secret_tokens_carry_no_kid():
+    key_ring = KeyRing(JWTKey.from_secret("secret"))
+    token = key_ring.encode(CLAIMS)
+
+    assert "kid" not in jwt.get_unverified_header(token)
+    assert key_ring.decode(token)["uid"] == 1
+    assert key_ring.jwks == {"keys": []}
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        key_ring.decode(jwt.encode(CLAIMS, "secret", algorithm="HS256", headers={"kid": "unknown"}))
+
+
+def test_rsa_jwk():
+    private_key = JWTKey.from_private_pem(private_pem(rsa.generate_private_key(public_exponent=65537, key_size=2048)))
+    numbers = private_key.signing_key.prepared_key.public_key().public_numbers()
+
+    public_jwk = private_key.public_jwk()
+
+    assert public_jwk["kty"] == "RSA"
+    assert public_jwk["alg"] == "RS256"
+    assert public_jwk["use"] == "sig"
+    assert public_jwk["n"] == b64(numbers.n, 256)
+    assert public_jwk["e"] == "AQAB"
+    assert "d" not in public_jwk
+    assert public_jwk["kid"] == _thumbprint(public_jwk)
+
+
+def test_ec_jwk():
+    private_key = JWTKey.from_private_pem(private_pem(ec.generate_private_key(ec.SECP256R1())))
+    numbers = private_key.signing_key.prepared_key.public_key().public_numbers()
+
+    public_jwk = private_key.public_jwk()
+
+    assert public_jwk["kty"] == "EC"
+    assert public_jwk["alg"] == "ES256"
+    assert public_jwk["use"] == "sig"
+    assert public_jwk["crv"] == "P-256"
+    assert public_jwk["x"] == b64(numbers.x, 32)
+    assert public_jwk["y"] == b64(numbers.y, 32)
+    assert "d" not in public_jwk
+    canonical = json.dumps(
+        {"crv": "P-256", "kty": "EC", "x": public_jwk["x"], "y": public_jwk["y"]}, separators=(",", ":")
+    )
+    expected = base64.urlsafe_b64encode(hashlib.sha256(canonical.encode()).digest()).rstrip(b"=").decode()
+    assert public_jwk["kid"] == expected
+
+
+def test_unsupported_curve_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported JWT key type"):
+        JWTKey.from_private_pem(private_pem(ec.generate_private_key(ec.SECP384R1())))
+
+
+async def test_jwks_lists_the_signing_and_previous_keys(monkeypatch, tmp_path, keys):
+    algorithm, (previous, current) = keys
+    (tmp_path / "current.pem").write_bytes(private_pem(current))
+    (tmp_path / "previous.pem").write_bytes(public_pem(previous))
+    monkeypatch.setattr(settings, "JWT_ALGORITHM", algorithm)
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_FILE", str(tmp_path / "current.pem"))
+    monkeypatch.setattr(settings, "JWT_PREVIOUS_PUBLIC_KEY_FILES", [str(tmp_path / "previous.pem")])
+    key_ring = load_key_ring()
+    monkeypatch.setattr(well_known, "_jwks", json.dumps(key_ring.jwks).encode())
+    app = FastAPI()
+    app.include_router(well_known.router)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver") as client:
+        response = await client.get("/.well-known/jwks.json")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "public, max-age=300"
+    published = response.json()["keys"]
+    assert [key["kid"] for key in published] == [
+        JWTKey.from_public_pem(public_pem(current)).kid,
+        JWTKey.from_public_pem(public_pem(previous)).kid,
+    ]
+    assert all(key["alg"] == algorithm and "d" not in key for key in published)
+    assert all(key["kid"] == _thumbprint(key) for key in published)
+
+
+def test_key_file_of_another_algorithm_is_rejected(monkeypatch, tmp_path, ec_keys):
+    (tmp_path / "key.pem").write_bytes(private_pem(ec_keys[0]))
+    monkeypatch.setattr(settings, "JWT_ALGORITHM", "RS256")
+    monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_FILE", str(tmp_path / "key.pem"))
+
+    with pytest.raises(ValueError, match="holds a ES256 key"):
+        load_key_ring()
@@ -0,0 +1,40 @@
+import pytest
+from fastapi_oauth2.core import OAuth2Core
+
+from app.services.users import LOCAL_ID_CLAIM
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+GITHUB_USER = {"id": 987654, "login": "octocat", "name": "Octo Cat", "email": "octocat@example.com"}
+
+
+@pytest.fixture
+def github(monkeypatch):
+    async def token_data(self, request, **httpx_client_args):
+        return self.standardize(dict(GITHUB_USER))
+
+    monkeypatch.setattr(OAuth2Core, "token_data", token_data)
+
+
+async def test_github_token_keeps_the_provider_identity(github, make_client, auth_service):
+    identities = []
+
+    async def on_auth(auth, user, request):
+        identities.append(user.identity)
+
+    async with make_client(callback=on_auth) as client:
+        response = await client.get(f"{API}/oauth2/github/token")
+        assert response.status_code == 307
+        assert "Authorization" in response.cookies
+        user = auth_service.users["github:987654"]
+
+        # the second request authenticates with the issued token
+        response = await client.get("/whoami")
+
+    assert response.status_code == 200
+    claims = response.json()
+    assert claims["id"] == GITHUB_USER["id"]
+    assert claims[LOCAL_ID_CLAIM] == user.id
+    assert claims["identity"] == "github:987654"
+    assert identities[-1] == "github:987654"
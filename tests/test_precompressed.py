@@ -0,0 +1,93 @@
+import gzip
+
+import pytest
+from starlette.requests import Request
+
+from app.utils import precompressed
+from app.utils.precompressed import Precompressed
+
+BODY = b'{"openapi": "3.1.0"}' * 100
+
+
+def make_request(**headers: str) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "headers": raw})
+
+
+@pytest.fixture
+def document() -> Precompressed:
+    return Precompressed(BODY, media_type="application/json")
+
+
+@pytest.fixture
+def without_brotli(monkeypatch) -> Precompressed:
+    monkeypatch.setattr(precompressed, "brotli", None)
+    return Precompressed(BODY, media_type="application/json")
+
+
+def test_identity_without_accept_encoding(document):
+    response = document.response(make_request())
+
+    assert response.body == BODY
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["content-type"] == "application/json"
+
+
+def test_gzip(without_brotli):
+    response = without_brotli.response(make_request(accept_encoding="gzip, deflate, br"))
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(response.body) == BODY
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_brotli_is_preferred(document):
+    brotli = pytest.importorskip("brotli")
+
+    response = document.response(make_request(accept_encoding="gzip, br"))
+
+    assert response.headers["content-encoding"] == "br"
+    assert brotli.decompress(response.body) == BODY
+
+
+def test_refused_encoding_is_not_used(document):
+    response = document.response(make_request(accept_encoding="br;q=0, gzip"))
+
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_variants_have_their_own_etags(document):
+    etags = {
+        document.response(make_request(accept_encoding=encoding)).headers["etag"] for encoding in ("", "gzip", "br")
+    }
+
+    assert len(etags) == len(document.variants)
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"])
+def test_matching_etag_gets_304(document, if_none_match):
+    etag = document.response(make_request(accept_encoding="gzip")).headers["etag"]
+
+    response = document.response(make_request(accept_encoding="gzip", if_none_match=if_none_match.format(etag=etag)))
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_other_etag_gets_the_body(document):
+    response = document.response(make_request(if_none_match='"other"'))
+
+    assert response.status_code == 200
+    assert response.body == BODY
+
+
+def test_etag_of_another_variant_gets_the_body(without_brotli):
+    gzip_etag = without_brotli.response(make_request(accept_encoding="gzip")).headers["etag"]
+
+    response = without_brotli.response(make_request(if_none_match=gzip_etag))
+
+    assert response.status_code == 200
+    assert response.body == BODY
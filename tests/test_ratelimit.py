@@ -0,0 +1,140 @@
+from fastapi import HTTPException
+
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.services import ratelimit
+from app.services.ratelimit import RateLimiter, client_ip
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+EMAIL = "someone@example.com"
+
+
+@pytest.fixture
+def limits(monkeypatch) -> dict[str, str]:
+    limits = {"login:ip": "10/minute", "login:email": "3/minute"}
+    monkeypatch.setattr(settings, "RATE_LIMITS", limits)
+    return limits
+
+
+@pytest.fixture
+def across_workers(monkeypatch) -> None:
+    """Every request lands on another worker, so only the Redis limit applies."""
+    monkeypatch.setattr(ratelimit.local_buckets, "take", lambda key, limit, period: 0)
+
+
+def make_request(host: str = "10.0.0.1", forwarded_for: str | None = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({"type": "http", "headers": headers, "client": (host, 40000)})
+
+
+async def check(
+    limiter: RateLimiter, email: str | None = EMAIL, host: str = "10.0.0.1", forwarded_for: str | None = None
+) -> int | None:
+    """The Retry-After of a rejected request, None when it was let through."""
+    try:
+        await limiter.check("login", make_request(host, forwarded_for), email=email)
+    except HTTPException as exc:
+        assert exc.status_code == 429
+        return int(exc.headers["Retry-After"])
+    return None
+
+
+async def test_login_over_the_limit_gets_429(client, limits):
+    for _ in range(3):
+        response = await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": "wrong password"})
+        assert response.status_code == 401
+
+    response = await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": "wrong password"})
+
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 20
+    assert response.json()["detail"]["error"] == "Too Many Requests"
+
+
+async def test_redis_limit_applies_across_workers(redis, limits, across_workers):
+    limiter = RateLimiter(redis)
+
+    assert [await check(limiter) for _ in range(3)] == [None, None, None]
+    retry_after = await check(limiter)
+
+    assert retry_after is not None and 1 <= retry_after <= 20
+    assert await redis.pttl(f"ratelimit:login:email:{EMAIL}") > 0
+
+
+async def test_limits_are_per_key(redis, limits, across_workers):
+    limiter = RateLimiter(redis)
+    for _ in range(3):
+        await check(limiter)
+
+    assert await check(limiter) is not None
+    assert await check(limiter, email="other@example.com") is None
+    assert await check(limiter, email=EMAIL.upper()) is not None
+
+
+async def test_rejected_request_charges_no_key(redis, limits, across_workers):
+    limiter = RateLimiter(redis)
+    for _ in range(3):
+        await check(limiter)
+    ip_key = "ratelimit:login:ip:10.0.0.1"
+    tat = await redis.get(ip_key)
+
+    assert await check(limiter) is not None
+    assert await redis.get(ip_key) == tat
+
+
+async def test_local_buckets_reject_without_redis(redis_server, redis, limits):
+    limiter = RateLimiter(redis)
+    for _ in range(3):
+        await check(limiter)
+    redis_server.connected = False
+
+    assert await check(limiter) is not None
+
+
+async def test_fails_open_when_redis_is_down(redis_server, redis, limits, across_workers):
+    redis_server.connected = False
+
+    assert await check(RateLimiter(redis)) is None
+
+
+async def test_disabled(redis, limits, monkeypatch, across_workers):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    limiter = RateLimiter(redis)
+
+    assert [await check(limiter) for _ in range(5)] == [None] * 5
+    assert not await redis.keys("ratelimit:*")
+
+
+@pytest.mark.parametrize(
+    "hops, forwarded_for, expected",
+    [
+        (0, "203.0.113.7", "10.0.0.1"),
+        (1, "203.0.113.7", "203.0.113.7"),
+        (1, "198.51.100.1, 203.0.113.7", "203.0.113.7"),
+        (2, "198.51.100.1, 203.0.113.7, 10.0.0.2", "203.0.113.7"),
+        (2, "203.0.113.7", "10.0.0.1"),
+        (1, None, "10.0.0.1"),
+        (1, "", "10.0.0.1"),
+    ],
+)
+def test_client_ip_behind_trusted_proxies(monkeypatch, hops, forwarded_for, expected):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXY_HOPS", hops)
+
+    assert client_ip(make_request("10.0.0.1", forwarded_for)) == expected
+
+
+async def test_clients_behind_a_proxy_are_limited_separately(redis, limits, across_workers, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXY_HOPS", 1)
+    limiter = RateLimiter(redis)
+    for i in range(10):
+        # a forged entry on the left does not give the client a fresh key
+        assert await check(limiter, email=None, forwarded_for=f"192.0.2.{i}, 203.0.113.7") is None
+
+    assert await check(limiter, email=None, forwarded_for="203.0.113.7") is not None
+    assert await check(limiter, email=None, forwarded_for="203.0.113.8") is None
+    assert await redis.exists("ratelimit:login:ip:203.0.113.7")
+    assert not await redis.exists("ratelimit:login:ip:10.0.0.1")
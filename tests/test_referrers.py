@@ -0,0 +1,29 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi_oauth2.middleware import User
+
+from app.routers.referrers import _current_user_id
+from app.services.users import LOCAL_ID_CLAIM
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeUserResolver:
+    def __init__(self, user) -> None:
+        self.user = user
+
+    async def get_current(self, auth_user):
+        return self.user
+
+
+async def test_local_id_claim_is_used():
+    request = SimpleNamespace(user=User({LOCAL_ID_CLAIM: 7, "id": 987654, "email": "octocat@example.com"}))
+    assert await _current_user_id(request, FakeUserResolver(None)) == 7
+
+
+async def test_provider_id_is_not_taken_for_a_local_id():
+    # tokens issued before the uid claim, or raw provider payloads, carry the provider's numeric id
+    request = SimpleNamespace(user=User({"id": 7, "identity": "github:987654", "email": "octocat@example.com"}))
+    user = SimpleNamespace(id=3)
+    assert await _current_user_id(request, FakeUserResolver(user)) == 3
@@ -0,0 +1,142 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.services.revocation import TokenRevocationList
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+EMAIL = "someone@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+async def wait_for(predicate, timeout: float = 3.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+async def workers(redis_server):
+    """Two workers' revocation lists sharing one Redis, both synced."""
+    lists = [TokenRevocationList(fakeredis.FakeAsyncRedis(server=redis_server)) for _ in range(2)]
+    for revocations in lists:
+        await revocations.start()
+    await wait_for(lambda: all(revocations._synced for revocations in lists))
+    yield lists
+    for revocations in lists:
+        await revocations.stop()
+
+
+async def test_revocation_reaches_other_workers(workers):
+    first, second = workers
+
+    await first.revoke("jti-1", int(time.time()) + 60)
+
+    await wait_for(lambda: "jti-1" in second._filter)
+    assert await second.is_revoked("jti-1")
+    assert not await second.is_revoked("jti-2")
+
+
+async def test_rebuild_loads_the_denylist(redis, redis_server):
+    # revoked while this worker was not running
+    await redis.set(f"{TokenRevocationList.KEY_PREFIX}jti-1", 1, ex=60)
+    revocations = TokenRevocationList(fakeredis.FakeAsyncRedis(server=redis_server))
+    await revocations.start()
+    try:
+        await wait_for(lambda: revocations._synced)
+        assert "jti-1" in revocations._filter
+        assert await revocations.is_revoked("jti-1")
+    finally:
+        await revocations.stop()
+
+
+async def test_rebuild_drops_expired_ids(redis, workers):
+    first, _ = workers
+    await first.revoke("jti-1", int(time.time()) + 60)
+    await redis.delete(f"{TokenRevocationList.KEY_PREFIX}jti-1")
+
+    await first._rebuild()
+
+    assert "jti-1" not in first._filter
+    assert not await first.is_revoked("jti-1")
+
+
+async def test_expired_tokens_are_not_stored(redis, workers):
+    first, _ = workers
+    await first.revoke("jti-1", int(time.time()) - 1)
+    assert not await redis.exists(f"{TokenRevocationList.KEY_PREFIX}jti-1")
+
+
+async def test_redis_failure_fails_closed(redis_server):
+    revocations = TokenRevocationList(fakeredis.FakeAsyncRedis(server=redis_server))
+    redis_server.connected = False
+    with pytest.raises(RedisError):
+        await revocations.is_revoked("jti-1")
+
+
+async def test_redis_failure_fails_open_when_configured(redis_server, monkeypatch):
+    monkeypatch.setattr(settings, "REVOCATION_FAIL_OPEN", True)
+    revocations = TokenRevocationList(fakeredis.FakeAsyncRedis(server=redis_server))
+    redis_server.connected = False
+    assert not await revocations.is_revoked("jti-1")
+
+
+async def test_revoked_token_is_rejected(client, auth_service):
+    auth_service.add_user(EMAIL, password=PASSWORD)
+    response = await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": PASSWORD})
+    access_token = response.cookies["Authorization"]
+    assert (await client.get("/whoami")).status_code == 200
+
+    await client.get(f"{API}/auth/logout")
+
+    response = await client.get("/whoami", headers={"Cookie": f"Authorization={access_token}"})
+    assert response.status_code == 400
+    assert response.text == "Token revoked"
+
+
+async def test_authenticated_request_gets_503_when_redis_is_down(client, auth_service, redis_server):
+    auth_service.add_user(EMAIL, password=PASSWORD)
+    await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": PASSWORD})
+    revocations = await client._transport.app.state.dishka_container.get(TokenRevocationList)
+    await wait_for(lambda: revocations._synced)
+
+    redis_server.connected = False
+    # the lost subscription leaves the filter unsynced, so every check has to ask Redis
+    await wait_for(lambda: not revocations._synced)
+    response = await client.get("/whoami")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert response.json()["error"] == "Service Unavailable"
+
+
+async def test_subscription_failure_falls_back_to_redis(redis, workers):
+    first, second = workers
+
+    # an undecodable payload ends the subscription with a non-Redis error
+    await redis.publish(TokenRevocationList.CHANNEL, b"\xff")
+    await wait_for(lambda: not second._synced)
+    # revoked without an announcement, only Redis knows
+    await redis.set(f"{TokenRevocationList.KEY_PREFIX}jti-1", 1, ex=60)
+
+    assert await second.is_revoked("jti-1")
+    await wait_for(lambda: second._synced)
+    assert "jti-1" in second._filter
+
+
+async def test_stop_ends_the_subscription(redis_server):
+    revocations = TokenRevocationList(fakeredis.FakeAsyncRedis(server=redis_server))
+    await revocations.start()
+    await wait_for(lambda: revocations._synced)
+
+    await revocations.stop()
+
+    assert revocations._task.done()
+    assert not revocations._synced
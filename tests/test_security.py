@@ -0,0 +1,118 @@
+import time
+
+import pytest
+from jose import JWTError
+
+from app.core.config import settings
+from app.services.security import JWTAuth, OAuth2Backend, verified_tokens
+from app.utils.cache import LRUCache
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+EMAIL = "someone@example.com"
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture
+def decodes(monkeypatch) -> list[str]:
+    """The tokens whose signature was actually verified."""
+    decodes = []
+    jwt_decode = JWTAuth.jwt_decode
+
+    def counting_decode(token: str) -> dict:
+        decodes.append(token)
+        return jwt_decode(token)
+
+    monkeypatch.setattr(JWTAuth, "jwt_decode", counting_decode)
+    return decodes
+
+
+def make_token(**claims) -> str:
+    return JWTAuth.jwt_encode({"uid": 1, "exp": int(time.time()) + 60, **claims})
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats().evictions == 1
+
+
+def test_lru_entries_expire():
+    cache = LRUCache(2)
+    cache.set("a", 1, expires_at=time.time() - 1)
+    cache.set("b", 2, expires_at=time.time() + 60)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert len(cache) == 1
+
+
+def test_verified_token_is_decoded_once(decodes):
+    token = make_token()
+    hits = verified_tokens.hits
+
+    first = OAuth2Backend.jwt_decode(token)
+    second = OAuth2Backend.jwt_decode(token)
+
+    assert first == second
+    assert decodes == [token]
+    assert verified_tokens.hits == hits + 1
+
+
+def later(monkeypatch, seconds: float) -> None:
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + seconds)
+
+
+def test_verified_token_is_forgotten_when_it_expires(decodes, monkeypatch):
+    token = make_token(exp=int(time.time()) + 60)
+    OAuth2Backend.jwt_decode(token)
+
+    later(monkeypatch, 61)
+    OAuth2Backend.jwt_decode(token)
+
+    assert decodes == [token, token]
+
+
+def test_verified_token_is_forgotten_after_the_cache_ttl(decodes, monkeypatch):
+    monkeypatch.setattr(settings, "JWT_CACHE_TTL", 10)
+    token = make_token(exp=int(time.time()) + 60)
+    OAuth2Backend.jwt_decode(token)
+
+    later(monkeypatch, 11)
+    OAuth2Backend.jwt_decode(token)
+
+    assert decodes == [token, token]
+
+
+def test_tampered_token_is_not_served_from_the_cache(decodes):
+    token = make_token()
+    OAuth2Backend.jwt_decode(token)
+    header, payload, signature = token.split(".")
+    tampered = f"{header}.{payload}.{signature[::-1]}"
+
+    with pytest.raises(JWTError):
+        OAuth2Backend.jwt_decode(tampered)
+
+
+async def test_cached_token_is_still_checked_for_revocation(client, auth_service):
+    auth_service.add_user(EMAIL, password=PASSWORD)
+    await client.post(f"{API}/auth/login", data={"email": EMAIL, "password": PASSWORD})
+    # the second request is served from the cache
+    assert (await client.get("/whoami")).status_code == 200
+    assert (await client.get("/whoami")).status_code == 200
+    access_cookie = client.cookies["Authorization"]
+
+    await client.get(f"{API}/auth/logout")
+    response = await client.get("/whoami", headers={"Cookie": f"Authorization={access_cookie}"})
+
+    assert response.status_code == 400
+    assert response.text == "Token revoked"
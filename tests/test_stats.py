@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.config import settings
+
+pytestmark = pytest.mark.anyio
+
+API = "/api/v1"
+PASSWORD = "correct horse battery staple"
+
+
+async def login(client, auth_service, email: str) -> int:
+    user = auth_service.add_user(email, password=PASSWORD)
+    response = await client.post(f"{API}/auth/login", data={"email": email, "password": PASSWORD})
+    assert response.status_code == 307
+    return user.id
+
+
+@pytest.mark.parametrize("path", ["/stats/db_pool", "/stats/db_replicas", "/stats/auth_caches"])
+async def test_stats_require_authentication(client, path):
+    response = await client.get(f"{API}{path}")
+    assert response.status_code == 401
+
+
+async def test_stats_require_admin(client, auth_service, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_USER_IDS", [1000])
+    await login(client, auth_service, "someone@example.com")
+
+    response = await client.get(f"{API}/stats/db_replicas")
+
+    assert response.status_code == 403
+
+
+async def test_stats_for_admins(client, auth_service, monkeypatch):
+    user_id = await login(client, auth_service, "admin@example.com")
+    monkeypatch.setattr(settings, "ADMIN_USER_IDS", [user_id])
+
+    response = await client.get(f"{API}/stats/db_replicas")
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+@pytest.mark.parametrize("path", ["/stats/db_replicas", "/admin/users/export"])
+async def test_registering_an_email_grants_nothing(client, monkeypatch, path):
+    # the admin has not signed up yet, anyone can register their email unverified
+    monkeypatch.setattr(settings, "ADMIN_USER_IDS", [1000])
+    response = await client.post(
+        f"{API}/auth/register",
+        json={"email": "admin@example.com", "name": "admin", "identity": "admin@example.com", "password": PASSWORD},
+    )
+    assert response.status_code == 307
+
+    response = await client.get(f"{API}{path}")
+
+    assert response.status_code == 403
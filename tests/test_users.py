@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi_oauth2.middleware import User as AuthUser
+
+from app.core.db import DbConnection
+from app.services.users import LOCAL_ID_CLAIM, UserResolver
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeUserDao:
+    def __init__(self, *users: SimpleNamespace) -> None:
+        self.users = users
+        self.calls = 0
+
+    async def _find(self, field: str, value):
+        self.calls += 1
+        return next((user for user in self.users if getattr(user, field) == value), None)
+
+    async def get_by_id(self, user_id: int):
+        return await self._find("id", user_id)
+
+    async def get_by_email(self, email: str):
+        return await self._find("email", email)
+
+    async def get_by_identity(self, identity: str):
+        return await self._find("identity", identity)
+
+
+@pytest.fixture
+def users():
+    return (
+        SimpleNamespace(id=7, email="someone@example.com", identity="someone@example.com"),
+        SimpleNamespace(id=8, email="octocat@example.com", identity="github:987654"),
+    )
+
+
+@pytest.fixture
+def resolver(users) -> UserResolver:
+    resolver = UserResolver(DbConnection())
+    resolver.user_dao = FakeUserDao(*users)
+    return resolver
+
+
+async def test_resolves_by_local_id(resolver, users):
+    assert await resolver.get_current(AuthUser({LOCAL_ID_CLAIM: 8, "id": 987654})) is users[1]
+
+
+async def test_provider_id_claim_is_ignored(resolver, users):
+    # a provider token whose numeric id happens to be another local user's primary key
+    token = AuthUser({"id": 7, "identity": "github:987654", "email": "octocat@example.com"})
+    assert await resolver.get_current(token) is users[1]
+
+
+async def test_user_is_loaded_once_per_request(resolver, users):
+    await resolver.get_current(AuthUser({LOCAL_ID_CLAIM: 8}))
+    assert await resolver.get_by_email("octocat@example.com") is users[1]
+    assert await resolver.get_by_identity("github:987654") is users[1]
+    assert resolver.user_dao.calls == 1